@@ -1,56 +1,204 @@
 import tkinter as tk
 from tkinter import ttk
-import csv  
 from tkinter import messagebox
-import pandas as pd
+import argparse
+import os
+import time
+from instrumentation import enable_tracing, span, traced
+from gradebook_store import (
+    COURSE_COLUMNS,
+    GRADE_COLUMNS,
+    SEMESTER_COLUMNS,
+    GradebookStore,
+    ensure_header,
+    write_rows_atomic,
+)
+from gradebook_sqlite import SQLiteGradebookStore
+from gradebook_api import ApiServer, GradebookService, OwnerCalls
+from gradebook_profiles import ProfileStore
+from grading_scale import DEFAULT_SCALE, GradingScale
+from gpa_aggregates import GpaAggregates
+from gradebook_records import parse_number
+from gradebook_validation import (
+    COURSE_CREDITS,
+    TERMS,
+    course_error,
+    grade_error,
+    semester_error,
+    syllabus_item_error,
+)
+from gpa_batch import recalculate_all
+from grade_planner import (
+    CoursePlan,
+    course_points_for_semester,
+    gpa_distribution,
+    grid_scenarios,
+    random_scenarios,
+    semester_gpas_for,
+)
+from record_list import RecordList
+from search_index import SearchIndex
+from gradebook_analytics import AnalyticsCache
+from persistence_worker import PersistenceWorker
 
 # File paths~
 SEMESTER_FILE = "semesters.csv"
 COURSES_FILE = "courses.csv"
 GRADES_FILE = "grades.csv"
 
-def normalize_columns(df):
-    df.columns = df.columns.str.strip().str.lower()  # Remove spaces and convert to lowercase
-    return df
+# Optional SQLite database; the CSV files are used when this is not set
+DB_FILE = os.environ.get("GRADEBOOK_DB")
 
+# Optional directory with one gradebook per student; the working directory holds
+# a single student's files when this is not set
+DATA_ROOT = os.environ.get("GRADEBOOK_DATA_ROOT")
 
+# Answer cross-student queries from columnar snapshots of each student's files
+USE_SNAPSHOTS = os.environ.get("GRADEBOOK_SNAPSHOTS") == "1"
+
+# Append grade changes to a journal instead of rewriting grades.csv each time
+JOURNAL_GRADES = os.environ.get("GRADEBOOK_JOURNAL") == "1"
+
+# Optional CSV file ("min,point" per band) replacing the default grading scale
+SCALE_FILE = os.environ.get("GRADING_SCALE_FILE")
+grading_scale = GradingScale.from_file(SCALE_FILE) if SCALE_FILE else DEFAULT_SCALE
+
+# Serve the gradebook as a JSON API on this localhost port while the window is open
+API_PORT = os.environ.get("GRADEBOOK_API_PORT")
+
+# How often the window runs the API requests waiting for it
+API_POLL_MS = 20
+
+# Save a grade being typed once no key has been pressed for this long
+GRADE_SAVE_DELAY_MS = 400
+
+# Default mark range for an ungraded item in the planner
+PLANNER_RANGE = ("50", "100")
+
+# Size of the GPA trend chart in the analytics window
+ANALYTICS_CHART_SIZE = (860, 200)
+
+pending_grade_save = None  # Tk after() id while typed grades wait to be saved
+course_summaries = {}      # (semester, course) -> refresh function of an open course window
+search_hits = []           # Entries shown in the search results, by row position
+api_server = None          # ApiServer while the JSON API is running
+api_calls = OwnerCalls()   # API calls waiting to run on the Tk thread
+
+
+# Hand a CSV rewrite to the persistence worker so the window never waits on the disk
+def background_write(path, columns, rows):
+    worker.submit(path, lambda: write_rows_atomic(path, columns, rows))
+
+
+# Wait for every queued file write to finish, reporting any that failed
+def flush_writes():
+    for path, error in worker.flush():
+        messagebox.showerror("File Error", f"Error saving {path}: {error}")
+
+
+# Create missing files and fix headers; only the first line of each file is read
 def initialize_files():
-    for file, columns in [(SEMESTER_FILE, ['semester', ' cgpa']),
-                          (COURSES_FILE, ['semester', ' course', ' credit', ' gpa']),
-                          (GRADES_FILE, ['semester', ' course', ' syllabus', ' weight', ' grade'])]:
-        try:
-            df = pd.read_csv(file)
-            df = normalize_columns(df)
-            df.to_csv(file, index=False)  # Save with normalized columns
-        except FileNotFoundError:
-            pd.DataFrame(columns=columns).to_csv(file, index=False)
+    for file, columns in [(SEMESTER_FILE, SEMESTER_COLUMNS),
+                          (COURSES_FILE, COURSE_COLUMNS),
+                          (GRADES_FILE, GRADE_COLUMNS)]:
+        if ensure_header(file, columns):
             print(f"Initialized {file} with columns: {columns}")  # Debug message
 
 
+# Open the gradebook, importing the CSV files the first time a database is used.
+# Rows the import skips as duplicates are left in store.duplicates, so the
+# window warns about them as it does for the CSV store.
+def open_store():
+    if not DB_FILE:
+        return GradebookStore(
+            SEMESTER_FILE, COURSES_FILE, GRADES_FILE, journal=JOURNAL_GRADES, writer=background_write
+        )
+    sqlite_store = SQLiteGradebookStore(DB_FILE)
+    if sqlite_store.is_empty():
+        sqlite_store.import_csv(SEMESTER_FILE, COURSES_FILE, GRADES_FILE)
+    return sqlite_store
+
+
+# Open a student's gradebook from the data root, creating it on first use
+def open_profile(student):
+    if not profiles.has_student(student):
+        profiles.create(student)
+    return profiles.open(student)
+
+
+# Show another student's gradebook in the main window. Only that student's
+# files are read; windows still showing the previous student are closed.
+@traced
+def switch_student(student):
+    global store, aggregates, search_index, analytics
+    save_pending_grades()
+    new_store = open_profile(student)
+    for window in root.winfo_children():
+        if isinstance(window, tk.Toplevel):
+            window.destroy()
+
+    store.unsubscribe(aggregates)
+    store.unsubscribe(search_index)
+    store.unsubscribe(analytics)
+    store = new_store
+    aggregates = GpaAggregates(grading_scale)
+    search_index = SearchIndex()
+    analytics = AnalyticsCache(store, grading_scale)
+    if api_server:
+        api_server.service.store, api_server.service.aggregates = store, aggregates
+    student_var.set(student)
+    semester_list.clear()
+    load_semesters()
+    load_gpa_totals()
+    load_search_index()
+    load_analytics()
+
+
+# Function to add a new student profile
+def save_student():
+    student = new_student_var.get().strip()
+    if student and profiles.has_student(student):
+        messagebox.showerror("Duplicate Student", f"The student '{student}' already exists.")
+        return
+    try:
+        switch_student(student)
+    except ValueError as e:
+        messagebox.showerror("Input Error", str(e))
+        return
+    student_dropdown["values"] = profiles.students()
+    new_student_var.set("")
+
+
+# Average semester GPA of every student, read one gradebook at a time
+@traced
+def show_class_average(semester_name):
+    # Profiles dropped from memory may still be writing their files
+    flush_writes()
+    average, count = profiles.class_average(semester_name, grading_scale)
+    if average is None:
+        messagebox.showinfo("No Data", f"No student has a GPA for '{semester_name}' yet.")
+        return
+    messagebox.showinfo("Class Average", f"Average GPA for '{semester_name}': {average:.2f} ({count} students)")
+
+
 # Function to save a semester
+@traced
 def save_semester():
     term = term_var.get()
     year = year_var.get()
     
-    if term == "Select Term" or not year.isdigit():
-        messagebox.showerror("Input Error", "Please select a term and enter a valid year.")
+    error = semester_error(term, year)
+    if error:
+        messagebox.showerror("Input Error", error)
         return
     
     semester_name = f"{term} {year}"
     
-    try:
-        with open(SEMESTER_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            next(reader, None)
-            if any(row and row[0] == semester_name for row in reader):
-                messagebox.showerror("Duplicate Semester", f"The semester '{semester_name}' already exists.")
-                return
-    except FileNotFoundError:
-        pass
-    
-    with open(SEMESTER_FILE, mode="a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow([semester_name, ""])
+    if store.has_semester(semester_name):
+        messagebox.showerror("Duplicate Semester", f"The semester '{semester_name}' already exists.")
+        return
+
+    store.add_semester(semester_name)
     
     add_semester_to_display(semester_name)
     term_var.set("Select Term")
@@ -58,94 +206,83 @@ def save_semester():
 
 # Function to add a semester to the UI
 def add_semester_to_display(semester_name):
-    frame = tk.Frame(output_frame, padx=5, pady=5)
-    frame.pack(fill=tk.X, anchor="w")
-
-    semester_label = tk.Label(frame, text=semester_name, font=("Arial", 12))
-    semester_label.pack(side=tk.LEFT)
-
-    gpa_var = tk.StringVar(value="GPA: N/A")
-    gpa_label = tk.Label(frame, textvariable=gpa_var, font=("Arial", 12), padx=10)
-    gpa_label.pack(side=tk.LEFT)
-
-    delete_button = tk.Button(
-        frame, text="X", font=("Arial", 10), fg="red", command=lambda: delete_semester(semester_name, frame)
-    )
-    delete_button.pack(side=tk.RIGHT)
-
-    open_button = tk.Button(
-        frame, text="Open", font=("Arial", 10), command=lambda: open_semester(semester_name)
+    semester_list.add_row(semester_name, (semester_name, format_gpa(aggregates.semester_gpa(semester_name))))
+
+# Format a GPA for display, showing N/A until there is something to average
+def format_gpa(gpa):
+    return f"{gpa:.2f}" if gpa is not None else "N/A"
+
+
+# Show the live totals for a semester and the whole gradebook
+def refresh_gpa_display(semester_name):
+    semester_list.set_value(semester_name, "gpa", format_gpa(aggregates.semester_gpa(semester_name)))
+    cgpa_var.set(format_gpa(aggregates.cumulative_gpa()))
+    credits_var.set(f"{aggregates.total_credits():.1f}")
+    for (summary_semester, _), refresh_summary in list(course_summaries.items()):
+        if summary_semester == semester_name:
+            refresh_summary()
+
+
+# Total weight, weighted average and GPA of a course, from the running totals
+def course_summary(semester_name, course_name):
+    average = aggregates.course_average(semester_name, course_name)
+    return (
+        f"Total Weight: {aggregates.course_total_weight(semester_name, course_name):g}%\n"
+        f"Average: {f'{average:.2f}%' if average is not None else 'N/A'}\n"
+        f"Course GPA: {format_gpa(aggregates.course_gpa(semester_name, course_name))}"
     )
-    open_button.pack(side=tk.RIGHT, padx=5)
 
 # GPA Mapping Function
 def get_gpa(mark):
-    grading_scale = pd.DataFrame({
-        'Min': [90, 85, 80, 75, 70, 65, 60, 50, 0],
-        'Max': [100, 89, 84, 79, 74, 69, 64, 59, 49],
-        'Point': [4.0, 3.9, 3.7, 3.3, 3.0, 2.7, 2.3, 1.7, 0.0]
-    })
-    grade_row = grading_scale[(grading_scale['Min'] <= mark) & (grading_scale['Max'] >= mark)]
-    return grade_row.iloc[0]['Point'] if not grade_row.empty else 0.0
+    return grading_scale.points(mark)
 
+@traced
 def calculate_course_gpa(semester_name, course_name):
-    grades = pd.read_csv(GRADES_FILE)
-    grades = normalize_columns(grades)  # Normalize columns
-    print("Grades DataFrame Columns:", grades.columns)  # Debug
-
-    course_grades = grades[(grades['semester'] == semester_name) & (grades['course'] == course_name)]
-
-    if course_grades.empty:
+    if not store.syllabus_rows(semester_name, course_name):
         messagebox.showinfo("No Data", f"No syllabus items found for course '{course_name}'.")
         return
 
-    total_weight = course_grades['weight'].sum()
-    if total_weight == 0:
+    course_gpa = aggregates.course_gpa(semester_name, course_name)
+    if course_gpa is None:
         messagebox.showinfo("No Data", f"Total weight for course '{course_name}' is zero.")
         return
 
-    weighted_sum = (course_grades['weight'] * course_grades['grade']).sum() / 100
-    weighted_average = (weighted_sum / total_weight) * 100
-    course_gpa = get_gpa(weighted_average)
-
-    # Update Course GPA in CSV
-    courses = pd.read_csv(COURSES_FILE)
-    courses = normalize_columns(courses)  # Normalize columns
-    courses.loc[(courses['semester'] == semester_name) & (courses['course'] == course_name), 'gpa'] = course_gpa
-    courses.to_csv(COURSES_FILE, index=False)
+    # Update Course GPA in the gradebook
+    store.set_course_gpa(semester_name, course_name, course_gpa)
 
     messagebox.showinfo("Course GPA", f"GPA for '{course_name}': {course_gpa:.2f}")
 
 
+@traced
 def calculate_semester_gpa(semester_name):
-    courses = pd.read_csv(COURSES_FILE)
-    courses = normalize_columns(courses)  # Normalize columns
-    print("Courses DataFrame Columns:", courses.columns)  # Debug
-
-    semester_courses = courses[courses['semester'] == semester_name]
-
-    if semester_courses.empty:
+    if not store.course_rows(semester_name):
         messagebox.showinfo("No Data", f"No courses found for semester '{semester_name}'.")
         return
 
-    total_credits = semester_courses['credit'].sum()
-    if total_credits == 0:
-        messagebox.showinfo("No Data", f"Total credits for semester '{semester_name}' are zero.")
+    semester_gpa = aggregates.semester_gpa(semester_name)
+    if semester_gpa is None:
+        messagebox.showinfo("No Data", f"No graded credits for semester '{semester_name}' yet.")
         return
 
-    weighted_gpa_sum = (semester_courses['credit'] * semester_courses['gpa']).sum()
-    semester_gpa = weighted_gpa_sum / total_credits
-
-    # Update Semester GPA in CSV
-    semesters = pd.read_csv(SEMESTER_FILE)
-    semesters = normalize_columns(semesters)  # Normalize columns
-    semesters.loc[semesters['semester'] == semester_name, 'cgpa'] = semester_gpa
-    semesters.to_csv(SEMESTER_FILE, index=False)
+    # Update Semester GPA in the gradebook
+    store.set_semester_gpa(semester_name, semester_gpa)
 
     messagebox.showinfo("Semester GPA", f"GPA for '{semester_name}': {semester_gpa:.2f}")
 
 
+# Recalculate and save every course and semester GPA in one pass
+@traced
+def recalculate_everything():
+    course_gpas, semester_gpas, cgpa = recalculate_all(store, grading_scale)
+    summary = f"CGPA: {cgpa:.2f}" if cgpa is not None else "CGPA: N/A"
+    messagebox.showinfo(
+        "Recalculated",
+        f"Updated {len(course_gpas)} course GPAs and {len(semester_gpas)} semester GPAs.\n{summary}",
+    )
+
+
 # Function to open a semester window
+@traced
 def open_semester(semester_name):
     new_window = tk.Toplevel(root)
     new_window.title(semester_name)
@@ -153,7 +290,7 @@ def open_semester(semester_name):
 
     # Variables to track total credits and GPA
     total_credits = tk.StringVar(value="0.0")
-    total_gpa = tk.StringVar(value="N/A")
+    total_gpa = tk.StringVar(value=format_gpa(aggregates.semester_gpa(semester_name)))
 
     # Create two columns
     left_column = tk.Frame(new_window, padx=10, pady=10, width=300)
@@ -181,12 +318,12 @@ def open_semester(semester_name):
     course_credit_var = tk.StringVar(value="0.5")
     tk.Label(left_column, text="Credit Type", font=("Arial", 12)).pack(anchor="center")
     credit_dropdown = ttk.Combobox(left_column, textvariable=course_credit_var, state="readonly", font=("Arial", 12), width=10)
-    credit_dropdown["values"] = ["0.5", "1.0"]
+    credit_dropdown["values"] = COURSE_CREDITS
     credit_dropdown.pack(pady=5, anchor="center")
     
     save_course_button = tk.Button(
         left_column, text="Create", font=("Arial", 12), 
-        command=lambda: save_course(semester_name, course_name_var, course_credit_var, course_list_frame, total_credits)
+        command=lambda: save_course(semester_name, course_name_var, course_credit_var, course_list, total_credits)
     )
     save_course_button.pack(pady=10, anchor="center")
     
@@ -199,114 +336,84 @@ def open_semester(semester_name):
     
     # Right column: Display courses
     tk.Label(right_column, text="Courses", font=("Arial", 14)).pack(anchor="w", pady=5)
-    course_list_frame = tk.Frame(right_column)
-    course_list_frame.pack(fill=tk.BOTH, expand=True)
+    course_list = RecordList(
+        right_column,
+        columns=[("course", "Course", 250), ("credit", "Credits", 80), ("gpa", "GPA", 80)],
+        actions=[
+            ("Open", lambda course_name: open_course(semester_name, course_name), None),
+            ("X", lambda course_name: delete_course(semester_name, course_name, course_list, total_credits), "red"),
+        ],
+    )
+    course_list.pack(fill=tk.BOTH, expand=True)
 
-    load_courses(semester_name, course_list_frame, total_credits)
+    load_courses(semester_name, course_list, total_credits)
 
 
 # Function to save a course
-def save_course(semester_name, course_name_var, course_credit_var, course_list_frame, total_credits):
+@traced
+def save_course(semester_name, course_name_var, course_credit_var, course_list, total_credits):
     course_name = course_name_var.get().strip()
     course_credit = course_credit_var.get().strip()
     
-    if not course_name or course_credit not in ["0.5", "1.0"]:
-        messagebox.showerror("Input Error", "Please enter a valid course name and select a valid credit type.")
+    error = course_error(course_name, course_credit)
+    if error:
+        messagebox.showerror("Input Error", error)
+        return
+
+    if store.has_course(semester_name, course_name):
+        messagebox.showerror("Duplicate Course", f"The course '{course_name}' already exists in {semester_name}.")
         return
     
     try:
-        with open(COURSES_FILE, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([semester_name, course_name, course_credit, ""])
+        store.add_course(semester_name, course_name, course_credit)
     except Exception as e:
         messagebox.showerror("File Error", f"Error saving course: {e}")
         return
 
-    add_course_to_display(course_list_frame, semester_name, course_name, course_credit, total_credits)
-    update_total_credits(total_credits, float(course_credit))
+    add_course_to_display(course_list, semester_name, course_name, course_credit)
+    show_semester_credits(semester_name, total_credits)
     course_name_var.set("")
     course_credit_var.set("0.5")
     messagebox.showinfo("Success", f"Course '{course_name}' added to {semester_name}!")
 
 
 # Function to load courses for a semester
-def load_courses(semester_name, course_list_frame, total_credits):
-    total = 0.0
-    try:
-        with open(COURSES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if row and row[0] == semester_name:
-                    add_course_to_display(course_list_frame, row[0], row[1], row[2], total_credits)
-                    total += float(row[2])
-    except FileNotFoundError:
-        pass
-    total_credits.set(f"{total:.1f}")
-
+def load_courses(semester_name, course_list, total_credits):
+    rows = [
+        (course_name, course_row_values(semester_name, course_name, course_credit))
+        for course_name, course_credit, _ in store.course_rows(semester_name)
+    ]
+    course_list.fill(rows)
+    show_semester_credits(semester_name, total_credits)
 
-# Function to add a course to the UI
-def add_course_to_display(course_list_frame, semester_name, course_name, course_credit, total_credits):
-    frame = tk.Frame(course_list_frame, padx=5, pady=5)
-    frame.pack(fill=tk.X, anchor="w")
-
-    course_label = tk.Label(frame, text=f"{course_name} ({course_credit} credits)", font=("Arial", 12))
-    course_label.pack(side=tk.LEFT)
 
-    delete_button = tk.Button(
-        frame, text="X", font=("Arial", 10), fg="red",
-        command=lambda: delete_course(semester_name, course_name, course_credit, frame, total_credits)
-    )
-    delete_button.pack(side=tk.RIGHT)
+# Values shown for one course in the course list
+def course_row_values(semester_name, course_name, course_credit):
+    return (course_name, course_credit, format_gpa(aggregates.course_gpa(semester_name, course_name)))
 
 
-    open_button = tk.Button(
-        frame, text="Open", font=("Arial", 10), command=lambda: open_course(semester_name, course_name)
-    )
-    open_button.pack(side=tk.RIGHT, padx=5)
+# Function to add a course to the UI
+def add_course_to_display(course_list, semester_name, course_name, course_credit):
+    course_list.add_row(course_name, course_row_values(semester_name, course_name, course_credit))
 
-# Function to update total credits
-def update_total_credits(total_credits, credit_change):
-    current_total = float(total_credits.get())
-    new_total = current_total + credit_change
-    total_credits.set(f"{new_total:.1f}")
+# Show a semester's total credits, as parsed once by the running totals
+def show_semester_credits(semester_name, total_credits):
+    total_credits.set(f"{aggregates.semester_credits(semester_name):.1f}")
 
 # Function to delete a course
-def delete_course(semester_name, course_name, course_credit, frame, total_credits):
-    # Update courses.csv by removing the course
-    updated_courses = []
-    try:
-        with open(COURSES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_courses = [row for row in reader if not (row and row[0] == semester_name and row[1] == course_name)]
-    except FileNotFoundError:
-        messagebox.showerror("File Error", "Courses file not found.")
-        return
-
-    with open(COURSES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_courses)
-
-    # Update grades.csv by removing syllabus items related to the course
-    updated_grades = []
-    try:
-        with open(GRADES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_grades = [row for row in reader if not (row and row[0] == semester_name and row[1] == course_name)]
-    except FileNotFoundError:
-        messagebox.showerror("File Error", "Grades file not found.")
-        return
-
-    with open(GRADES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_grades)
+@traced
+def delete_course(semester_name, course_name, course_list, total_credits):
+    # Remove the course and its syllabus items from the gradebook
+    store.delete_course(semester_name, course_name)
 
     # Update UI
-    frame.destroy()
-    update_total_credits(total_credits, -float(course_credit))
+    course_list.remove_row(course_name)
+    show_semester_credits(semester_name, total_credits)
     messagebox.showinfo("Deleted", f"Course '{course_name}' and its syllabus items have been deleted.")
 
 
 # Function to open a course
+@traced
 def open_course(semester_name, course_name):
     course_window = tk.Toplevel(root)
     course_window.title(f"{course_name} - {semester_name}")
@@ -333,10 +440,16 @@ def open_course(semester_name, course_name):
 
     save_syllabus_button = tk.Button(
         left_column, text="Add Item", font=("Arial", 12),
-        command=lambda: save_syllabus_item(semester_name, course_name, syllabus_item_name_var, syllabus_item_weight_var, syllabus_list_frame)
+        command=lambda: save_syllabus_item(semester_name, course_name, syllabus_item_name_var, syllabus_item_weight_var, syllabus_list)
     )
     save_syllabus_button.pack(pady=10)
 
+    paste_button = tk.Button(
+        left_column, text="Paste Items", font=("Arial", 12),
+        command=lambda: paste_syllabus_items(semester_name, course_name, syllabus_list)
+    )
+    paste_button.pack(pady=10)
+
     # Add Calculate Course GPA button
     calculate_gpa_button = tk.Button(
         left_column, text="Calculate Course GPA", font=("Arial", 12),
@@ -344,244 +457,669 @@ def open_course(semester_name, course_name):
     )
     calculate_gpa_button.pack(pady=10)
 
+    plan_button = tk.Button(
+        left_column, text="Plan Grades", font=("Arial", 12),
+        command=lambda: open_planner(semester_name, course_name)
+    )
+    plan_button.pack(pady=10)
+
     # Right column: Display syllabus items
     right_column = tk.Frame(course_window, padx=10, pady=10)
     right_column.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
     tk.Label(right_column, text=f"Syllabus Items for {course_name}", font=("Arial", 14)).pack(anchor="w", pady=5)
-    syllabus_list_frame = tk.Frame(right_column)
-    syllabus_list_frame.pack(fill=tk.BOTH, expand=True)
+    syllabus_list = RecordList(
+        right_column,
+        columns=[("syllabus", "Syllabus Item", 250), ("weight", "Weight (%)", 90), ("grade", "Grade", 90)],
+        actions=[
+            ("Edit Grade", lambda syllabus_name: syllabus_list.edit_cell(syllabus_name, "grade"), None),
+            ("X", lambda syllabus_name: delete_syllabus_item(semester_name, course_name, syllabus_name, syllabus_list), "red"),
+        ],
+        editable={"grade": lambda syllabus_name, grade: update_grade(semester_name, course_name, syllabus_name, grade)},
+        live={"grade": lambda syllabus_name, grade: preview_grade(semester_name, course_name, syllabus_name, grade)},
+    )
+    syllabus_list.pack(fill=tk.BOTH, expand=True)
 
-    load_syllabus_items(semester_name, course_name, syllabus_list_frame)
+    # Live totals, refreshed by the running totals as grades are typed
+    summary_var = tk.StringVar()
+    tk.Label(left_column, textvariable=summary_var, font=("Arial", 12), justify=tk.LEFT).pack(pady=10, anchor="w")
 
+    def refresh_summary():
+        summary_var.set(course_summary(semester_name, course_name))
 
+    def forget_summary(event):
+        if event.widget is course_window and course_summaries.get(summary_key) is refresh_summary:
+            del course_summaries[summary_key]
 
-# Function to delete a semester
-def delete_semester(semester_name, frame):
-    # Remove the semester from the semesters.csv file
-    updated_semesters = []
+    summary_key = (semester_name, course_name)
+    course_summaries[summary_key] = refresh_summary
+    course_window.bind("<Destroy>", forget_summary)
+    refresh_summary()
+
+    load_syllabus_items(semester_name, course_name, syllabus_list)
+
+
+# What-if planner for a course: the marks needed on the ungraded items for a
+# target course or semester GPA, and the GPA spread over many possible marks
+@traced
+def open_planner(semester_name, course_name):
+    planner_window = tk.Toplevel(root)
+    planner_window.title(f"Plan Grades - {course_name}")
+    planner_window.geometry("800x600")
+
+    left_column = tk.Frame(planner_window, padx=10, pady=10, width=300)
+    left_column.pack(side=tk.LEFT, fill=tk.Y)
+    right_column = tk.Frame(planner_window, padx=10, pady=10)
+    right_column.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+    tk.Label(left_column, text="Target GPA", font=("Arial", 14)).pack(pady=5, anchor="w")
+    target_var = tk.StringVar(value="4.0")
+    tk.Entry(left_column, textvariable=target_var, font=("Arial", 12)).pack(pady=5, anchor="w", fill=tk.X)
+    target_kind_var = tk.StringVar(value="course")
+    tk.Radiobutton(left_column, text="Course GPA", variable=target_kind_var, value="course").pack(anchor="w")
+    tk.Radiobutton(left_column, text="Semester GPA", variable=target_kind_var, value="semester").pack(anchor="w")
+    answer_var = tk.StringVar()
+    tk.Button(
+        left_column, text="Solve", font=("Arial", 12),
+        command=lambda: answer_var.set(solve_target(semester_name, course_name, target_var.get(), target_kind_var.get()))
+    ).pack(pady=5)
+    tk.Label(left_column, textvariable=answer_var, font=("Arial", 11), wraplength=280, justify=tk.LEFT).pack(anchor="w")
+
+    tk.Label(left_column, text="Scenarios", font=("Arial", 14)).pack(pady=(15, 5), anchor="w")
+    tk.Label(left_column, text="Monte Carlo samples:", font=("Arial", 12)).pack(anchor="w")
+    samples_var = tk.StringVar(value="10000")
+    tk.Entry(left_column, textvariable=samples_var, font=("Arial", 12)).pack(pady=5, anchor="w", fill=tk.X)
+    tk.Label(left_column, text="Grid step (%):", font=("Arial", 12)).pack(anchor="w")
+    step_var = tk.StringVar(value="5")
+    tk.Entry(left_column, textvariable=step_var, font=("Arial", 12)).pack(pady=5, anchor="w", fill=tk.X)
+    results_var = tk.StringVar()
+    for text, kind, size_var in [("Monte Carlo", "random", samples_var), ("Grid Sweep", "grid", step_var)]:
+        tk.Button(
+            left_column, text=text, font=("Arial", 12),
+            command=lambda kind=kind, size_var=size_var: results_var.set(
+                run_scenarios(semester_name, course_name, range_list, kind, size_var.get()))
+        ).pack(pady=5)
+
+    tk.Label(right_column, text="Ungraded items (double-click a range to edit)", font=("Arial", 14)).pack(anchor="w", pady=5)
+    range_list = RecordList(
+        right_column,
+        columns=[("syllabus", "Syllabus Item", 200), ("weight", "Weight (%)", 90), ("low", "Low", 70), ("high", "High", 70)],
+        editable={
+            "low": lambda syllabus_name, value: check_mark(value),
+            "high": lambda syllabus_name, value: check_mark(value),
+        },
+        height=8,
+    )
+    range_list.pack(fill=tk.X)
+    plan = CoursePlan(store.syllabus_rows(semester_name, course_name), grading_scale)
+    range_list.fill([(name, (name, f"{weight:g}") + PLANNER_RANGE) for name, weight in plan.ungraded])
+    tk.Label(right_column, textvariable=results_var, font=("Courier", 11), justify=tk.LEFT).pack(anchor="w", pady=10)
+
+
+# Planner marks must be numbers from 0 to 100
+def check_mark(value):
+    mark = parse_number(value)
+    if mark is None or not 0 <= mark <= 100:
+        messagebox.showerror("Input Error", "Please enter a mark from 0 to 100.")
+        return False
+    return True
+
+
+# Describe the lowest mark needed on each ungraded item for a target GPA
+def solve_target(semester_name, course_name, target_text, target_kind):
+    target = parse_number(target_text)
+    if target is None:
+        return "Please enter a target GPA."
+    plan = CoursePlan(store.syllabus_rows(semester_name, course_name), grading_scale)
+    if not plan.ungraded:
+        return "Every syllabus item is graded; there is nothing left to plan."
+
+    course_target = target
+    if target_kind == "semester":
+        course_target = course_points_for_semester(aggregates, semester_name, course_name, target)
+        if course_target is None:
+            return f"A {target:.2f} semester GPA is out of reach with this course alone."
+    mark = plan.mark_for_gpa(course_target)
+    if mark is None:
+        return "Not reachable, even with 100% on every remaining item."
+    if mark <= 0:
+        return "Already secured, whatever the remaining marks."
+    names = ", ".join(name for name, _ in plan.ungraded)
+    return f"At least {mark:.1f}% on each remaining item ({names}) for a course GPA of {course_target:.2f}."
+
+
+# Evaluate many possible sets of marks at once and describe the GPA spread
+@traced
+def run_scenarios(semester_name, course_name, range_list, kind, size_text):
+    plan = CoursePlan(store.syllabus_rows(semester_name, course_name), grading_scale)
+    if not plan.ungraded:
+        return "Every syllabus item is graded; there is nothing left to plan."
+    ranges = []
+    for name, _ in plan.ungraded:
+        low, high = (range_list.value(name, column) if range_list.has_row(name) else default
+                     for column, default in zip(("low", "high"), PLANNER_RANGE))
+        ranges.append(sorted((float(low), float(high))))
+
+    size = parse_number(size_text)
+    if size is None or size <= 0:
+        return "Please enter a positive number of samples or grid step."
+    if kind == "random" and int(size) < 1:
+        return "Please enter at least one sample."
+    start = time.perf_counter()
     try:
-        with open(SEMESTER_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_semesters = [row for row in reader if row and row[0] != semester_name]
-    except FileNotFoundError:
-        messagebox.showerror("File Error", "Semesters file not found.")
+        scenarios = random_scenarios(ranges, int(size)) if kind == "random" else grid_scenarios(ranges, size)
+    except ValueError as e:
+        return str(e)
+    course_gpas = plan.evaluate(scenarios)
+    semester_gpas = semester_gpas_for(aggregates, semester_name, course_name, course_gpas)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    lines = [f"{len(scenarios)} scenarios in {elapsed:.0f} ms", "", "Course GPA   share"]
+    lines += [f"{gpa:>10.2f}   {share:6.1%}" for gpa, share in gpa_distribution(course_gpas)]
+    semester_mean = semester_gpas.mean()
+    lines += ["", f"Mean course GPA:   {course_gpas.mean():.2f}",
+              f"Mean semester GPA: {format_gpa(None if semester_mean != semester_mean else semester_mean)}"]
+    return "\n".join(lines)
+
+
+# GPA trend across semesters and per-course statistics. The numbers come from
+# the analytics cache, so reopening the window (or Refresh) only recomputes
+# the semesters changed since it was last shown.
+@traced
+def open_analytics():
+    analytics_window = tk.Toplevel(root)
+    analytics_window.title("Analytics")
+    analytics_window.geometry("900x700")
+
+    width, height = ANALYTICS_CHART_SIZE
+    chart = tk.Canvas(analytics_window, width=width, height=height, bg="white")
+    chart.pack(padx=10, pady=10)
+
+    tk.Label(analytics_window, text="Semesters", font=("Arial", 14)).pack(anchor="w", padx=10)
+    trend_list = RecordList(
+        analytics_window,
+        columns=[("semester", "Semester", 250), ("gpa", "GPA", 80), ("credits", "Credits", 80), ("cgpa", "CGPA to Date", 120)],
+        height=6,
+    )
+    trend_list.pack(fill=tk.X, padx=10)
+
+    tk.Label(analytics_window, text="Courses", font=("Arial", 14)).pack(anchor="w", padx=10, pady=(10, 0))
+    course_stats_list = RecordList(
+        analytics_window,
+        columns=[
+            ("semester", "Semester", 120), ("course", "Course", 120), ("gpa", "GPA", 60),
+            ("graded", "Weight Graded", 150), ("distribution", "Item Grade Points", 330),
+        ],
+        height=10,
+    )
+    course_stats_list.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    tk.Button(
+        analytics_window, text="Refresh", font=("Arial", 12),
+        command=lambda: show_analytics(chart, trend_list, course_stats_list)
+    ).pack(pady=5)
+    show_analytics(chart, trend_list, course_stats_list)
+
+
+def show_analytics(chart, trend_list, course_stats_list):
+    trend = analytics.trend()
+    draw_gpa_chart(chart, trend)
+    trend_list.clear()
+    trend_list.fill([
+        (stats.semester, (stats.semester, format_gpa(stats.gpa), f"{stats.credits:.1f}", format_gpa(cgpa)))
+        for stats, cgpa in trend
+    ])
+    course_stats_list.clear()
+    course_stats_list.fill([
+        (str(position), values) for position, values in enumerate(
+            (stats.semester, course.course, format_gpa(course.gpa), format_completion(course),
+             format_distribution(course.distribution))
+            for stats, _ in trend for course in stats.courses
+        )
+    ])
+
+
+# "60/100% (60%)": graded weight out of the course's total weight
+def format_completion(course):
+    if course.completion is None:
+        return "No weight"
+    return f"{course.graded_weight:g}/{course.total_weight:g}% ({course.completion:.0%})"
+
+
+# "4.0 x2, 3.7 x1": how many graded items earned each grade point value
+def format_distribution(distribution):
+    if not distribution:
+        return "No grades"
+    return ", ".join(f"{points:.1f} x{count}" for points, count in sorted(distribution.items(), reverse=True))
+
+
+# Line chart of semester GPA (blue) and CGPA to date (gray) in semester order
+def draw_gpa_chart(chart, trend):
+    chart.delete("all")
+    width, height = ANALYTICS_CHART_SIZE
+    left, top, right, bottom = 40, 15, width - 15, height - 25
+    top_points = max(grading_scale.grade_points) or 1.0
+    chart.create_line(left, top, left, bottom, right, bottom)
+    for value in (0.0, top_points / 2, top_points):
+        y = bottom - (bottom - top) * value / top_points
+        chart.create_text(left - 5, y, text=f"{value:.1f}", anchor="e", font=("Arial", 9))
+    if not trend:
+        chart.create_text(width / 2, height / 2, text="No semesters yet", font=("Arial", 12))
         return
 
-    with open(SEMESTER_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_semesters)
+    step = (right - left) / max(len(trend) - 1, 1)
+    label_every = max(len(trend) // 8, 1)
+    for index, (stats, _) in enumerate(trend):
+        if index % label_every == 0:
+            chart.create_text(left + index * step, bottom + 12, text=stats.semester, font=("Arial", 9))
+    for series, colour in ((0, "blue"), (1, "gray")):
+        coords = []
+        for index, (stats, cgpa) in enumerate(trend):
+            value = stats.gpa if series == 0 else cgpa
+            if value is None:
+                continue
+            x, y = left + index * step, bottom - (bottom - top) * value / top_points
+            chart.create_oval(x - 3, y - 3, x + 3, y + 3, fill=colour, outline=colour)
+            coords += [x, y]
+        if len(coords) >= 4:
+            chart.create_line(*coords, fill=colour, width=2)
+    chart.create_text(right, top, text="Semester GPA", fill="blue", anchor="ne", font=("Arial", 9))
+    chart.create_text(right, top + 14, text="CGPA to date", fill="gray", anchor="ne", font=("Arial", 9))
 
-    # Remove all courses related to the semester from courses.csv
-    updated_courses = []
-    try:
-        with open(COURSES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_courses = [row for row in reader if row and row[0] != semester_name]
-    except FileNotFoundError:
-        pass
-
-    with open(COURSES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_courses)
-
-    # Remove all grades related to the semester from grades.csv
-    updated_grades = []
-    try:
-        with open(GRADES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_grades = [row for row in reader if row and row[0] != semester_name]
-    except FileNotFoundError:
-        pass
 
-    with open(GRADES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_grades)
+# Function to delete a semester
+@traced
+def delete_semester(semester_name):
+    # Remove the semester, its courses and its syllabus items from the gradebook
+    store.delete_semester(semester_name)
 
     # Update the UI
-    frame.destroy()
+    semester_list.remove_row(semester_name)
     messagebox.showinfo("Deleted", f"Semester '{semester_name}', its courses, and syllabus items have been deleted.")
 
 
 # Load semesters on startup
 def load_semesters():
-    try:
-        with open(SEMESTER_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            next(reader, None)
-            for row in reader:
-                if row:
-                    add_semester_to_display(row[0])
-    except FileNotFoundError:
-        pass
+    semester_list.fill([
+        (semester_name, (semester_name, format_gpa(aggregates.semester_gpa(semester_name))))
+        for semester_name in store.semester_names()
+    ])
+
 # Function to save a syllabus item
-def save_syllabus_item(semester_name, course_name, syllabus_item_var, weight_var, syllabus_frame):
+@traced
+def save_syllabus_item(semester_name, course_name, syllabus_item_var, weight_var, syllabus_list):
     syllabus_item = syllabus_item_var.get().strip()
     weight = weight_var.get().strip()
 
-    if not syllabus_item or not weight.isdigit():
-        messagebox.showerror("Input Error", "Please enter a valid syllabus item and weight.")
+    error = syllabus_item_error(syllabus_item, weight)
+    if error:
+        messagebox.showerror("Input Error", error)
+        return
+
+    if store.has_syllabus_item(semester_name, course_name, syllabus_item):
+        messagebox.showerror("Duplicate Item", f"The syllabus item '{syllabus_item}' already exists in {course_name}.")
         return
 
     try:
-        with open(GRADES_FILE, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([semester_name, course_name, syllabus_item, weight, ""])  # Empty string for grade
+        store.add_syllabus_item(semester_name, course_name, syllabus_item, weight)  # Empty grade
     except Exception as e:
         messagebox.showerror("File Error", f"Error saving syllabus item: {e}")
         return
 
     # Add the new item to the UI
-    add_syllabus_item_to_display(
-        syllabus_frame, semester_name, course_name, syllabus_item, weight, ""
-    )
+    add_syllabus_item_to_display(syllabus_list, syllabus_item, weight, "")
 
     syllabus_item_var.set("")  # Clear the input fields
     weight_var.set("")
     messagebox.showinfo("Success", f"Syllabus item '{syllabus_item}' added to {course_name}!")
 
 
-# Function to delete a syllabus item
-def delete_syllabus_item(semester, course, syllabus_name, frame):
+# Add every "name, weight" line on the clipboard as a syllabus item. Rows
+# copied from a spreadsheet arrive tab-separated, which works the same way.
+# All items are added in one batch, so grades.csv is written once.
+@traced
+def paste_syllabus_items(semester_name, course_name, syllabus_list):
     try:
-        with open(GRADES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_rows = [
-                row for row in reader
-                if not (row[0] == semester and row[1] == course and row[2] == syllabus_name)
-            ]
-    except FileNotFoundError:
-        messagebox.showerror("File Error", "Grades file not found.")
+        text = root.clipboard_get()
+    except tk.TclError:
+        messagebox.showerror("Paste Error", "The clipboard is empty.")
         return
 
-    with open(GRADES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_rows)
+    items, skipped, names = [], [], set()
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        fields = [field.strip() for field in line.replace("\t", ",").split(",")]
+        syllabus_item, weight = fields[0], fields[1] if len(fields) > 1 else ""
+        if (syllabus_item_error(syllabus_item, weight) or syllabus_item in names
+                or store.has_syllabus_item(semester_name, course_name, syllabus_item)):
+            skipped.append(line.strip())
+            continue
+        items.append((syllabus_item, weight))
+        names.add(syllabus_item)
+
+    try:
+        with store.batch():
+            for syllabus_item, weight in items:
+                store.add_syllabus_item(semester_name, course_name, syllabus_item, weight)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Error saving syllabus items: {e}")
+        return
+
+    syllabus_list.fill([(syllabus_item, (syllabus_item, weight, "")) for syllabus_item, weight in items])
+    message = f"Added {len(items)} syllabus items to {course_name}."
+    if skipped:
+        message += f"\nSkipped {len(skipped)} invalid or duplicate lines, such as '{skipped[0]}'."
+    messagebox.showinfo("Paste Items", message)
+
 
-    frame.destroy()  # Remove the UI element
+# Function to delete a syllabus item
+@traced
+def delete_syllabus_item(semester, course, syllabus_name, syllabus_list):
+    store.delete_syllabus_item(semester, course, syllabus_name)
+
+    syllabus_list.remove_row(syllabus_name)  # Remove the UI element
     messagebox.showinfo("Deleted", f"Syllabus item '{syllabus_name}' has been deleted.")
 
 
-# Function to update a grade
+# Function to update a grade when its cell is committed (Enter or leaving the cell)
+@traced
 def update_grade(semester, course, syllabus_name, grade):
-    try:
-        with open(GRADES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            updated_rows = []
-            for row in reader:
-                if row[0] == semester and row[1] == course and row[2] == syllabus_name:
-                    row[4] = grade  # Update the grade field
-                updated_rows.append(row)
-    except FileNotFoundError:
-        messagebox.showerror("File Error", "Grades file not found.")
+    error = grade_error(grade)
+    if error:
+        messagebox.showerror("Input Error", error)
+        return False
+
+    if not store.update_grade(semester, course, syllabus_name, grade):
+        save_pending_grades()
+        messagebox.showerror("Update Error", f"Syllabus item '{syllabus_name}' no longer exists.")
+        return False
+
+    save_pending_grades()
+    return True
+
+
+# Apply a grade while it is being typed. The store and the running totals
+# change on every keystroke; the typed grades are written in one batch once
+# typing pauses, and the persistence worker writes that batch in the background.
+def preview_grade(semester, course, syllabus_name, grade):
+    global pending_grade_save
+    if grade_error(grade):
+        return  # Not a number (yet), e.g. a lone "."
+    if pending_grade_save is None:
+        store.begin_batch()
+    else:
+        root.after_cancel(pending_grade_save)
+    pending_grade_save = root.after(GRADE_SAVE_DELAY_MS, save_pending_grades)
+    store.update_grade(semester, course, syllabus_name, grade)
+
+
+# Write out the grades typed since the last save, if any
+def save_pending_grades():
+    global pending_grade_save
+    if pending_grade_save is None:
         return
+    root.after_cancel(pending_grade_save)
+    pending_grade_save = None
+    store.end_batch()
 
-    with open(GRADES_FILE, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerows(updated_rows)
 
-    messagebox.showinfo("Updated", f"Grade for '{syllabus_name}' updated to {grade}.")
+# Function to add a syllabus item to the UI
+# Grades are edited in place (double-click the grade cell or use "Edit Grade")
+# and saved as they are typed
+def add_syllabus_item_to_display(syllabus_list, syllabus_name, syllabus_weight, syllabus_grade):
+    syllabus_list.add_row(syllabus_name, (syllabus_name, syllabus_weight, syllabus_grade or ""))
 
 
-# Function to add a syllabus item to the UI
-def add_syllabus_item_to_display(frame, semester, course, syllabus_name, syllabus_weight, syllabus_grade):
-    item_frame = tk.Frame(frame, padx=5, pady=5)
-    item_frame.pack(fill=tk.X, anchor="w")
-
-    # Syllabus details
-    tk.Label(item_frame, text=f"Syllabus: {syllabus_name}", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
-    tk.Label(item_frame, text=f"Weight: {syllabus_weight}%", font=("Arial", 12)).pack(side=tk.LEFT, padx=5)
-
-    # Grade input
-    grade_entry = tk.Entry(item_frame, font=("Arial", 12), width=8)
-    grade_entry.insert(0, syllabus_grade or "")  # Pre-fill with existing grade if available
-    grade_entry.pack(side=tk.RIGHT, padx=5)
-
-    # Save grade button
-    save_button = tk.Button(
-        item_frame, text="Save Grade", font=("Arial", 10),
-        command=lambda: update_grade(semester, course, syllabus_name, grade_entry.get())
+# Function to load syllabus items for a course
+def load_syllabus_items(semester_name, course_name, syllabus_list):
+    syllabus_list.fill([
+        (syllabus_name, (syllabus_name, weight, grade or ""))
+        for syllabus_name, weight, grade in store.syllabus_rows(semester_name, course_name)
+    ])
+
+# Read the courses and grades once the main window is on screen
+def load_gpa_totals():
+    with span("load_gpa_totals"):
+        store.subscribe(aggregates)
+        aggregates.on_change = refresh_gpa_display
+        for semester_name in store.semester_names():
+            refresh_gpa_display(semester_name)
+        refresh_gpa_display(None)
+    warn_about_duplicates()
+
+
+# Rows that repeat an earlier semester, course or syllabus item are kept in
+# the files but only the first one counts, so say so instead of hiding them
+def warn_about_duplicates():
+    counts = [f"{table}: {len(rows)}" for table, rows in store.duplicates.items() if rows]
+    if counts:
+        messagebox.showwarning(
+            "Duplicate Rows",
+            "Some rows repeat an earlier row with the same name:\n" + "\n".join(counts)
+            + "\n\nOnly the first of each is used; the others are kept in the files unchanged.",
+        )
+
+
+# Index every semester, course and syllabus item name for the search box
+def load_search_index():
+    with span("load_search_index"):
+        store.subscribe(search_index)
+    run_search()
+
+
+# Follow store changes so the analytics window knows which semesters to recompute
+def load_analytics():
+    with span("load_analytics"):
+        store.subscribe(analytics)
+
+
+# Show the matches for the text in the search box; runs on every keystroke
+def run_search(*args):
+    global search_hits
+    search_hits = search_index.search(search_var.get())
+    search_list.clear()
+    search_list.fill([(str(position), describe_hit(hit)) for position, hit in enumerate(search_hits)])
+
+
+# Values shown for one search result: the matching name and where it is
+def describe_hit(hit):
+    semester_name, course_name, syllabus_name = hit
+    if course_name is None:
+        return (semester_name, "Semester")
+    if syllabus_name is None:
+        return (course_name, semester_name)
+    return (syllabus_name, f"{course_name} - {semester_name}")
+
+
+# Open a search result: a semester's window, or the window of the course
+# a course or syllabus item belongs to
+def open_search_hit(row_id):
+    semester_name, course_name, _ = search_hits[int(row_id)]
+    if course_name is None:
+        open_semester(semester_name)
+    else:
+        open_course(semester_name, course_name)
+
+
+# Show a saving indicator while the worker writes, and report failed writes
+def poll_persistence():
+    for path, error in worker.poll():
+        messagebox.showerror("File Error", f"Error saving {path}: {error}")
+    saving_var.set("Saving…" if worker.busy() else "")
+    root.after(200, poll_persistence)
+
+
+# Serve the gradebook to other local tools. Requests are queued for the Tk
+# thread and answered from memory there, so the store and the window only
+# ever change here and reads never see a change half made.
+def start_api(port):
+    global api_server
+    if port is None:
+        return
+    api_server = ApiServer(GradebookService(store, aggregates, api_calls), port=port)
+    try:
+        api_server.start_thread()
+    except OSError as e:
+        api_server = None
+        messagebox.showerror("API Error", f"Could not serve the gradebook on port {port}: {e}")
+        return
+    poll_api()
+
+
+# Run queued API calls; after writes, show any semesters they added or removed.
+# Reads change nothing, so they leave the lists and the selection alone.
+def poll_api():
+    if api_calls.run_pending():
+        shown = semester_list.row_ids()
+        for semester_name in store.semester_names():
+            if semester_name not in shown:
+                add_semester_to_display(semester_name)
+        for semester_name in shown:
+            if not store.has_semester(semester_name):
+                semester_list.remove_row(semester_name)
+        run_search()
+    root.after(API_POLL_MS, poll_api)
+
+
+# Make sure the gradebook is written out before the window closes
+def on_close():
+    if api_server:
+        api_server.stop()
+    save_pending_grades()
+    if profiles:
+        profiles.close()
+    else:
+        store.close()
+    for path, error in worker.stop():
+        messagebox.showerror("File Error", f"Error saving {path}: {error}")
+    root.destroy()
+
+
+# The GUI only starts when run as a script; importing this module has no side effects
+if __name__ == "__main__":
+    # Command-line options; --trace can also be set through GRADEBOOK_TRACE
+    parser = argparse.ArgumentParser(description="CGPA Calculator")
+    parser.add_argument("--trace", metavar="FILE", help="record timing spans to a JSON trace file")
+    parser.add_argument("--student", help="student profile to open when GRADEBOOK_DATA_ROOT is set")
+    parser.add_argument("--api-port", type=int, default=int(API_PORT) if API_PORT else None,
+                        help="serve the gradebook as a JSON API on this localhost port")
+    args, _ = parser.parse_known_args()
+    if args.trace:
+        enable_tracing(args.trace)
+
+    # CSV rewrites run on this thread so the window never waits on the disk
+    worker = PersistenceWorker()
+
+    # Gradebook loaded once; callbacks read and mutate it instead of the files.
+    # With a data root, only the current student's gradebook and a few recent
+    # ones are kept in memory.
+    profiles = None
+    if DATA_ROOT:
+        profiles = ProfileStore(DATA_ROOT, snapshots=USE_SNAPSHOTS, wait_for_writes=flush_writes,
+                                journal=JOURNAL_GRADES, writer=background_write)
+        store = open_profile(args.student or next(iter(profiles.students()), "default"))
+    else:
+        if not DB_FILE:
+            initialize_files()
+        store = open_store()
+
+    # Running course, semester and cumulative GPA totals that follow the store.
+    # They need every course and grade, so they are filled after the first paint.
+    aggregates = GpaAggregates(grading_scale)
+
+    # Name index for the search box, kept up to date by the same store hooks
+    search_index = SearchIndex()
+
+    # Per-semester statistics for the analytics window, cached between openings
+    analytics = AnalyticsCache(store, grading_scale)
+
+    # Main application window
+    root = tk.Tk()
+    root.title("CGPA Calculator")
+    root.geometry("800x600")
+
+    input_frame = tk.Frame(root, padx=10, pady=10, width=300)
+    input_frame.pack(side=tk.LEFT, fill=tk.Y)
+    output_frame = tk.Frame(root, padx=10, pady=10)
+    output_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+    # Student profiles, when the gradebooks live under a data root
+    if profiles:
+        tk.Label(input_frame, text="Student", font=("Arial", 14)).pack(pady=5)
+        student_var = tk.StringVar()
+        student_dropdown = ttk.Combobox(input_frame, textvariable=student_var, state="readonly", font=("Arial", 12), width=20)
+        student_dropdown["values"] = profiles.students()
+        student_dropdown.bind("<<ComboboxSelected>>", lambda event: switch_student(student_var.get()))
+        student_dropdown.pack(pady=5)
+
+        new_student_var = tk.StringVar()
+        tk.Entry(input_frame, textvariable=new_student_var, font=("Arial", 12)).pack(pady=5)
+        tk.Button(input_frame, text="Add Student", font=("Arial", 12), command=save_student).pack(pady=5)
+
+    tk.Label(input_frame, text="My CGPA", font=("Arial", 14)).pack(pady=5)
+    cgpa_var = tk.StringVar()
+    cgpa_entry = tk.Entry(input_frame, textvariable=cgpa_var, font=("Arial", 12), state="readonly")
+    cgpa_entry.pack(pady=5)
+
+    tk.Label(input_frame, text="My Credits", font=("Arial", 14)).pack(pady=5)
+    credits_var = tk.StringVar()
+    credits_entry = tk.Entry(input_frame, textvariable=credits_var, font=("Arial", 12), state="readonly")
+    credits_entry.pack(pady=5)
+
+    tk.Label(input_frame, text="").pack(pady=10)
+    tk.Label(input_frame, text="Create Semester", font=("Arial", 14)).pack(pady=5)
+
+    term_var = tk.StringVar(value="Select Term")
+    term_dropdown = ttk.Combobox(input_frame, textvariable=term_var, state="readonly", font=("Arial", 12), width=20)
+    term_dropdown["values"] = TERMS
+    term_dropdown.pack(pady=5)
+
+    year_var = tk.StringVar()
+    tk.Label(input_frame, text="Year:", font=("Arial", 12)).pack(pady=5)
+    year_entry = tk.Entry(input_frame, textvariable=year_var, font=("Arial", 12))
+    year_entry.pack(pady=5)
+
+    create_button = tk.Button(input_frame, text="Create", font=("Arial", 12), command=save_semester)
+    create_button.pack(pady=10)
+
+    recalculate_button = tk.Button(input_frame, text="Recalculate All", font=("Arial", 12), command=recalculate_everything)
+    recalculate_button.pack(pady=10)
+
+    analytics_button = tk.Button(input_frame, text="Analytics", font=("Arial", 12), command=open_analytics)
+    analytics_button.pack(pady=10)
+
+    saving_var = tk.StringVar()
+    tk.Label(input_frame, textvariable=saving_var, font=("Arial", 10), fg="gray").pack(side=tk.BOTTOM, pady=5)
+
+    tk.Label(output_frame, text="Search", font=("Arial", 14)).pack(anchor="w", pady=5)
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(output_frame, textvariable=search_var, font=("Arial", 12))
+    search_entry.pack(fill=tk.X, pady=5)
+    search_var.trace_add("write", run_search)
+    search_entry.bind("<Return>", lambda event: search_hits and open_search_hit("0"))
+    search_list = RecordList(
+        output_frame,
+        columns=[("name", "Match", 250), ("where", "In", 250)],
+        actions=[("Open", open_search_hit, None)],
+        height=5,
     )
-    save_button.pack(side=tk.RIGHT, padx=5)
-
-    # Delete syllabus item button
-    delete_button = tk.Button(
-        item_frame, text="X", font=("Arial", 10), fg="red",
-        command=lambda: delete_syllabus_item(semester, course, syllabus_name, item_frame)
+    search_list.pack(fill=tk.X)
+
+    tk.Label(output_frame, text="Semesters", font=("Arial", 14)).pack(anchor="w", pady=5)
+    semester_list = RecordList(
+        output_frame,
+        columns=[("semester", "Semester", 300), ("gpa", "GPA", 100)],
+        actions=[("Open", open_semester, None), ("X", delete_semester, "red")]
+        + ([("Class Average", show_class_average, None)] if profiles else []),
     )
-    delete_button.pack(side=tk.RIGHT, padx=5)
+    semester_list.pack(fill=tk.BOTH, expand=True)
+    if profiles:
+        student_var.set(next(reversed(profiles.loaded)))
+    load_semesters()
 
+    root.after_idle(lambda: root.after(0, lambda: (load_gpa_totals(), load_search_index(), load_analytics(), start_api(args.api_port))))
 
-# Function to load syllabus items for a course
-def load_syllabus_items(semester_name, course_name, syllabus_frame):
-    try:
-        with open(GRADES_FILE, mode="r") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if row and row[0] == semester_name and row[1] == course_name:
-                    add_syllabus_item_to_display(
-                        syllabus_frame, semester_name, course_name, row[2], row[3], row[4]
-                    )
-    except FileNotFoundError:
-        pass
-
-    # Variables for total weight and grade
-    total_weight_var = tk.StringVar(value="0%")
-
-    # Function to calculate total weight
-    def calculate_total_weight():
-        total_weight = 0
-        try:
-            with open(GRADES_FILE, mode="r") as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if row[0] == semester_name and row[1] == course_name:
-                        total_weight += int(row[3])  # Add weight of each syllabus item
-        except FileNotFoundError:
-            pass
-
-        total_weight_var.set(f"{total_weight}%")  # Update the total weight display
-
-    # Call the function to calculate weight initially
-    calculate_total_weight()
-
-# Main application window
-root = tk.Tk()
-root.title("CGPA Calculator")
-root.geometry("800x600")
-
-input_frame = tk.Frame(root, padx=10, pady=10, width=300)
-input_frame.pack(side=tk.LEFT, fill=tk.Y)
-output_frame = tk.Frame(root, padx=10, pady=10)
-output_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-
-tk.Label(input_frame, text="My CGPA", font=("Arial", 14)).pack(pady=5)
-cgpa_var = tk.StringVar()
-cgpa_entry = tk.Entry(input_frame, textvariable=cgpa_var, font=("Arial", 12), state="readonly")
-cgpa_entry.pack(pady=5)
-
-tk.Label(input_frame, text="My Credits", font=("Arial", 14)).pack(pady=5)
-credits_var = tk.StringVar()
-credits_entry = tk.Entry(input_frame, textvariable=credits_var, font=("Arial", 12), state="readonly")
-credits_entry.pack(pady=5)
-
-tk.Label(input_frame, text="").pack(pady=10)
-tk.Label(input_frame, text="Create Semester", font=("Arial", 14)).pack(pady=5)
-
-term_var = tk.StringVar(value="Select Term")
-term_dropdown = ttk.Combobox(input_frame, textvariable=term_var, state="readonly", font=("Arial", 12), width=20)
-term_dropdown["values"] = ["Winter", "Summer", "Fall"]
-term_dropdown.pack(pady=5)
-
-year_var = tk.StringVar()
-tk.Label(input_frame, text="Year:", font=("Arial", 12)).pack(pady=5)
-year_entry = tk.Entry(input_frame, textvariable=year_var, font=("Arial", 12))
-year_entry.pack(pady=5)
-
-create_button = tk.Button(input_frame, text="Create", font=("Arial", 12), command=save_semester)
-create_button.pack(pady=10)
-
-tk.Label(output_frame, text="Semesters", font=("Arial", 14)).pack(anchor="w", pady=5)
-load_semesters()
-
-root.mainloop()     
\ No newline at end of file
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    poll_persistence()
+    root.mainloop()
@@ -0,0 +1,174 @@
+# Headless benchmarks for the gradebook operations; no display is needed.
+# Run from the repository root:
+#   python -m benchmarks.bench_gradebook --sizes 100 10000 1000000 --output bench.json
+import argparse
+import importlib.util
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_data import generate_gradebook, semester_name
+from gpa_aggregates import GpaAggregates
+from gradebook_analytics import semester_stats
+from gradebook_store import GradebookStore
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+# Run fn repeats times and summarise the wall-clock times in milliseconds
+def measure(fn, repeats):
+    times = []
+    for run in range(repeats):
+        start = time.perf_counter()
+        fn(run)
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeats": repeats,
+        "min_ms": round(min(times), 4),
+        "median_ms": round(statistics.median(times), 4),
+        "max_ms": round(max(times), 4),
+    }
+
+
+def open_store(paths, **options):
+    return GradebookStore(*paths, **options)
+
+
+# Open a store and read every table, not just the semesters read at startup
+def load_everything(paths):
+    store = open_store(paths)
+    store.courses, store.grades
+    return store
+
+
+# One course's GPA, computed from its syllabus items without running totals
+def course_gpa_from_store(store, semester, course):
+    aggregates = GpaAggregates()
+    for syllabus, weight, grade in store.syllabus_rows(semester, course):
+        aggregates.item_added(semester, course, syllabus, weight, grade)
+    return aggregates.course_gpa(semester, course)
+
+
+# Time each gradebook operation against a generated data set of grade_rows rows
+def bench_size(grade_rows, repeats):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_gradebook(directory, grade_rows)
+
+        results["startup_load"] = measure(lambda run: open_store(paths), repeats)
+        results["initial_load"] = measure(lambda run: load_everything(paths), repeats)
+
+        store = open_store(paths)
+        semesters = store.semester_names()
+        results["save_semester_duplicate_check"] = measure(
+            lambda run: store.has_semester(semesters[run % len(semesters)]), repeats
+        )
+
+        first_course = store.course_rows(semesters[0])[0][0]
+        first_item = store.syllabus_rows(semesters[0], first_course)[0][0]
+        results["update_grade"] = measure(
+            lambda run: store.update_grade(semesters[0], first_course, first_item, str(50 + run % 50)), repeats
+        )
+
+        journal_store = open_store(paths, journal=True)
+        results["update_grade_journal"] = measure(
+            lambda run: journal_store.update_grade(semesters[0], first_course, first_item, str(50 + run % 50)),
+            repeats,
+        )
+        journal_store.close()
+
+        aggregates = GpaAggregates()
+        start = time.perf_counter()
+        store.subscribe(aggregates)
+        results["aggregate_build_ms"] = round((time.perf_counter() - start) * 1000, 4)
+
+        # A grade change as the window sees it: the running sums of the course
+        # are refreshed, then its course and semester GPAs are read
+        def changed_course_gpa(run):
+            aggregates.grade_changed(semesters[0], first_course, first_item, str(50 + run % 50))
+            return aggregates.course_gpa(semesters[0], first_course)
+
+        def changed_semester_gpa(run):
+            aggregates.grade_changed(semesters[0], first_course, first_item, str(50 + run % 50))
+            return aggregates.semester_gpa(semesters[0])
+
+        results["course_gpa"] = measure(changed_course_gpa, repeats)
+        results["semester_gpa"] = measure(changed_semester_gpa, repeats)
+        # The same GPAs computed from scratch out of the store's rows
+        results["course_gpa_cold"] = measure(lambda run: course_gpa_from_store(store, semesters[0], first_course),
+                                             repeats)
+        results["semester_gpa_cold"] = measure(lambda run: semester_stats(store, semesters[0]).gpa, repeats)
+
+        if importlib.util.find_spec("pandas") is None:
+            results["recalculate_all"] = None
+        else:
+            from gpa_batch import recalculate_all
+
+            results["recalculate_all"] = measure(lambda run: recalculate_all(store), min(repeats, 3))
+
+        if importlib.util.find_spec("numpy") is None:
+            results["snapshot_build"] = results["snapshot_open"] = results["snapshot_recalculate"] = None
+        else:
+            from gradebook_snapshot import GradebookSnapshot, open_snapshot, snapshot_path
+
+            store.flush()
+            snapshot_dir = snapshot_path(paths[2])
+            results["snapshot_build"] = measure(
+                lambda run: GradebookSnapshot.build(paths[1], paths[2], snapshot_dir), min(repeats, 3)
+            )
+            results["snapshot_open"] = measure(lambda run: open_snapshot(paths[1], paths[2]), repeats)
+            snapshot = open_snapshot(paths[1], paths[2])
+            results["snapshot_recalculate"] = measure(
+                lambda run: (snapshot.semester_gpas(), snapshot.cumulative_gpa()), repeats
+            )
+
+        # Delete from the end so every run removes a semester that still exists
+        deletions = min(repeats, len(semesters))
+        results["delete_semester"] = measure(
+            lambda run: store.delete_semester(semester_name(len(semesters) - 1 - run)), deletions
+        )
+    return results
+
+
+def git_revision():
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gradebook operations on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="grade row counts to test (up to 1000000)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} grade rows...", file=sys.stderr)
+        report["results"][str(size)] = bench_size(size, args.repeats)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, mode="w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
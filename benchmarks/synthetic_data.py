@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+
+from gradebook_store import COURSE_COLUMNS, GRADE_COLUMNS, SEMESTER_COLUMNS, write_rows
+
+TERMS = ["Winter", "Summer", "Fall"]
+
+
+# Semester names in order: Winter 2000, Summer 2000, Fall 2000, Winter 2001, ...
+def semester_name(index):
+    return f"{TERMS[index % 3]} {2000 + index // 3}"
+
+
+# Write semesters.csv, courses.csv and grades.csv with about grade_rows syllabus
+# items into directory. Returns the three file paths.
+def generate_gradebook(directory, grade_rows, courses_per_semester=5, items_per_course=5, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, name) for name in ("semesters.csv", "courses.csv", "grades.csv")]
+
+    rows_per_semester = courses_per_semester * items_per_course
+    semester_count = max(1, -(-grade_rows // rows_per_semester))
+    weight = 100 // items_per_course
+
+    semesters, courses, grades = [], [], []
+    for index in range(semester_count):
+        semester = semester_name(index)
+        semesters.append([semester, ""])
+        for number in range(courses_per_semester):
+            course = f"cct{100 + number}"
+            courses.append([semester, course, rng.choice(["0.5", "1.0"]), ""])
+            for item in range(items_per_course):
+                if len(grades) >= grade_rows:
+                    break
+                grades.append([semester, course, f"a{item + 1}", str(weight), str(rng.randint(40, 100))])
+
+    write_rows(paths[0], SEMESTER_COLUMNS, semesters)
+    write_rows(paths[1], COURSE_COLUMNS, courses)
+    write_rows(paths[2], GRADE_COLUMNS, grades)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic gradebook.")
+    parser.add_argument("directory")
+    parser.add_argument("--rows", type=int, default=10000, help="number of syllabus item rows")
+    parser.add_argument("--courses-per-semester", type=int, default=5)
+    parser.add_argument("--items-per-course", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_gradebook(args.directory, args.rows, args.courses_per_semester, args.items_per_course, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import threading
+
+
+# Identify a version of a file by modification time and size; None if missing
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Parsed contents of files, shared by every reader in the process.
+# Entries are keyed by (path, kind), where kind names the parsed form (such
+# as CSV rows of a given width), and remember the file signature they were
+# parsed from. An external edit changes the signature, so the next get()
+# parses the file again. Our own writes call invalidate(), so the next get()
+# parses what was written.
+# Cached values are shared; callers must treat them as read-only.
+class ParsedFileCache:
+    def __init__(self):
+        self.entries = {}  # (path, kind) -> (signature, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, kind, parse):
+        key = (os.path.abspath(path), kind)
+        signature = file_signature(path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = parse(path)
+        with self.lock:
+            self.entries[key] = (signature, value)
+        return value
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == path]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+FILE_CACHE = ParsedFileCache()
+
@@ -0,0 +1,146 @@
+from gradebook_records import number
+from gradebook_store import GradebookListener
+from grading_scale import DEFAULT_SCALE
+
+# Running sums closer to zero than this are add/subtract drift, e.g. what is
+# left after adding and removing courses of 0.1, 0.2 and 0.3 credits
+EPSILON = 1e-9
+
+
+# Snap running sums that have drifted to within EPSILON of zero back to zero,
+# so emptied courses and semesters have no GPA instead of 0.0
+def _settle(sums):
+    for index, value in enumerate(sums):
+        if abs(value) < EPSILON:
+            sums[index] = 0.0
+
+
+# Running GPA totals kept up to date from store change hooks.
+# Each course keeps its total weight and weight * grade sum, each semester its
+# credit * GPA sum, and the whole gradebook a cumulative total, so any single
+# change adjusts a handful of numbers instead of regrouping the files.
+# As in calculate_course_gpa, ungraded items count towards the total weight.
+# Courses without any syllabus weight have no GPA yet and are left out of the
+# semester and cumulative GPA, but their credits are still counted.
+class GpaAggregates(GradebookListener):
+    def __init__(self, scale=DEFAULT_SCALE, on_change=None):
+        self.scale = scale
+        self.on_change = on_change  # Called with the semester whose totals moved
+        self.items = {}           # (semester, course) -> {syllabus: (weight, grade)}
+        self.course_sums = {}     # (semester, course) -> [total weight, weight * grade]
+        self.course_gpas = {}     # (semester, course) -> GPA or None
+        self.credits = {}         # (semester, course) -> credit
+        self.semester_courses = {}  # semester -> set of courses with credits or items
+        self.semester_sums = {}   # semester -> [graded credits, credit * GPA, all credits]
+        self.totals = [0.0, 0.0, 0.0]
+
+    # Queries
+    def course_total_weight(self, semester, course):
+        return self.course_sums.get((semester, course), [0.0, 0.0])[0]
+
+    def course_average(self, semester, course):
+        total_weight, weighted_sum = self.course_sums.get((semester, course), [0.0, 0.0])
+        if total_weight <= 0:
+            return None
+        # Rounding keeps add/subtract drift from pushing a mark across a band edge
+        return round(weighted_sum / total_weight, 9)
+
+    def course_gpa(self, semester, course):
+        return self.course_gpas.get((semester, course))
+
+    def semester_credits(self, semester):
+        return self.semester_sums.get(semester, [0.0, 0.0, 0.0])[2]
+
+    def semester_gpa(self, semester):
+        graded_credits, points, _ = self.semester_sums.get(semester, [0.0, 0.0, 0.0])
+        return points / graded_credits if graded_credits > 0 else None
+
+    def total_credits(self):
+        return self.totals[2]
+
+    def cumulative_gpa(self):
+        graded_credits, points, _ = self.totals
+        return points / graded_credits if graded_credits > 0 else None
+
+    # Move a course's credit * GPA contribution in its semester and the totals
+    def _contribute(self, key, sign):
+        credit = self.credits.get(key)
+        if credit is None:
+            return
+        gpa = self.course_gpas.get(key)
+        sums = self.semester_sums.setdefault(key[0], [0.0, 0.0, 0.0])
+        delta = [credit, credit * gpa, credit] if gpa is not None else [0.0, 0.0, credit]
+        for index in range(3):
+            sums[index] += sign * delta[index]
+            self.totals[index] += sign * delta[index]
+        _settle(sums)
+        _settle(self.totals)
+
+    def _refresh_course(self, key):
+        self._contribute(key, -1)
+        average = self.course_average(*key)
+        self.course_gpas[key] = self.scale.points(average) if average is not None else None
+        self._contribute(key, 1)
+        if self.on_change:
+            self.on_change(key[0])
+
+    def _item_sums(self, key, weight, grade, sign):
+        sums = self.course_sums.setdefault(key, [0.0, 0.0])
+        sums[0] += sign * (weight or 0.0)
+        if weight is not None and grade is not None:
+            sums[1] += sign * weight * grade
+        _settle(sums)
+
+    # Store hooks
+    def semester_removed(self, semester):
+        for course in list(self.semester_courses.pop(semester, ())):
+            self.course_removed(semester, course)
+        self.semester_sums.pop(semester, None)
+        self.semester_courses.pop(semester, None)
+        if self.on_change:
+            self.on_change(semester)
+
+    def course_added(self, semester, course, credit):
+        key = (semester, course)
+        self._contribute(key, -1)
+        self.credits[key] = number(credit) or 0.0
+        self.semester_courses.setdefault(semester, set()).add(course)
+        self.course_gpas.setdefault(key, None)
+        self._contribute(key, 1)
+        if self.on_change:
+            self.on_change(semester)
+
+    def course_removed(self, semester, course):
+        key = (semester, course)
+        self._contribute(key, -1)
+        self.credits.pop(key, None)
+        self.items.pop(key, None)
+        self.course_sums.pop(key, None)
+        self.course_gpas.pop(key, None)
+        self.semester_courses.get(semester, set()).discard(course)
+        if self.on_change:
+            self.on_change(semester)
+
+    def item_added(self, semester, course, syllabus, weight, grade):
+        key = (semester, course)
+        items = self.items.setdefault(key, {})
+        self.semester_courses.setdefault(semester, set()).add(course)
+        if syllabus in items:
+            self._item_sums(key, *items[syllabus], -1)
+        items[syllabus] = (number(weight), number(grade))
+        self._item_sums(key, *items[syllabus], 1)
+        self._refresh_course(key)
+
+    def item_removed(self, semester, course, syllabus):
+        key = (semester, course)
+        old = self.items.get(key, {}).pop(syllabus, None)
+        if old is not None:
+            self._item_sums(key, *old, -1)
+            self._refresh_course(key)
+
+    def grade_changed(self, semester, course, syllabus, grade):
+        key = (semester, course)
+        items = self.items.get(key, {})
+        if syllabus in items:
+            weight = items[syllabus][0]
+            self.item_added(semester, course, syllabus, weight, grade)
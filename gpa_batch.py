@@ -0,0 +1,88 @@
+import argparse
+
+from gradebook_store import GradebookStore
+from grading_scale import DEFAULT_SCALE, GradingScale
+
+
+# A column as numbers, with blank, bad and non-finite values as 0.0, matching
+# what number() and GpaAggregates make of them
+def _numeric(column):
+    import numpy as np
+    import pandas as pd
+
+    values = pd.to_numeric(column, errors="coerce")
+    return values.where(np.isfinite(values), 0.0)
+
+
+# Recalculate every course GPA, every semester GPA and the overall CGPA in one
+# pass: a single groupby over all syllabus items, then one over the courses.
+# Results go back through the store's bulk setters, so each file is written
+# at most once. Follows the same rules as GpaAggregates: ungraded items count
+# towards the total weight, and courses without any weight have no GPA.
+# Returns ({(semester, course): gpa}, {semester: gpa}, cgpa).
+def recalculate_all(store, scale=DEFAULT_SCALE):
+    import pandas as pd
+
+    grades = pd.DataFrame(
+        list(store.iter_grades()), columns=["semester", "course", "syllabus", "weight", "grade"]
+    )
+    courses = pd.DataFrame(list(store.iter_courses()), columns=["semester", "course", "credit", "gpa"])
+
+    # Course GPAs from one groupby over every syllabus item
+    grades["weight"] = _numeric(grades["weight"])
+    grades["points"] = grades["weight"] * _numeric(grades["grade"])
+    sums = grades.groupby(["semester", "course"], sort=False)[["weight", "points"]].sum()
+    sums = sums[sums["weight"] > 0]
+    averages = (sums["points"] / sums["weight"]).round(9)
+    course_gpas = pd.Series(scale.points_array(averages.to_numpy()), index=averages.index, name="course_gpa")
+
+    # Semester GPAs from the credit-weighted course GPAs
+    courses["credit"] = _numeric(courses["credit"])
+    courses = courses.join(course_gpas, on=["semester", "course"])
+    graded = courses["course_gpa"].notna()
+    courses["graded_credit"] = courses["credit"].where(graded, 0.0)
+    courses["credit_points"] = (courses["credit"] * courses["course_gpa"]).where(graded, 0.0)
+    semester_sums = courses.groupby("semester", sort=False)[["graded_credit", "credit_points"]].sum()
+    semester_sums = semester_sums[semester_sums["graded_credit"] > 0]
+    semester_gpas = semester_sums["credit_points"] / semester_sums["graded_credit"]
+
+    graded_credits = semester_sums["graded_credit"].sum()
+    cgpa = semester_sums["credit_points"].sum() / graded_credits if graded_credits > 0 else None
+
+    store.set_course_gpas(
+        (semester, course, "" if pd.isna(gpa) else float(gpa))
+        for semester, course, gpa in courses[["semester", "course", "course_gpa"]].itertuples(index=False)
+    )
+    store.set_semester_gpas(
+        (semester, float(semester_gpas[semester]) if semester in semester_gpas.index else "")
+        for semester in store.semester_names()
+    )
+
+    return (
+        {key: float(gpa) for key, gpa in course_gpas.items()},
+        {semester: float(gpa) for semester, gpa in semester_gpas.items()},
+        float(cgpa) if cgpa is not None else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalculate every course and semester GPA.")
+    parser.add_argument("--semesters", default="semesters.csv")
+    parser.add_argument("--courses", default="courses.csv")
+    parser.add_argument("--grades", default="grades.csv")
+    parser.add_argument("--scale", help="CSV grading scale with 'min' and 'point' columns")
+    args = parser.parse_args()
+
+    scale = GradingScale.from_file(args.scale) if args.scale else DEFAULT_SCALE
+    store = GradebookStore(args.semesters, args.courses, args.grades)
+    course_gpas, semester_gpas, cgpa = recalculate_all(store, scale)
+    store.close()
+
+    for semester, gpa in semester_gpas.items():
+        print(f"{semester}: {gpa:.2f}")
+    print(f"CGPA: {cgpa:.2f}" if cgpa is not None else "CGPA: N/A")
+    print(f"{len(course_gpas)} course GPAs updated.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from gpa_aggregates import GpaAggregates
+from gradebook_profiles import ProfileStore
+from gradebook_snapshot import open_snapshot
+from gradebook_store import GradebookStore, parse_rows
+from grading_scale import DEFAULT_SCALE, GradingScale
+
+RESULT_COLUMNS = ["student", "level", "semester", "course", "credit", "gpa"]
+
+
+# Course, semester and cumulative GPAs for one student directory, as result rows.
+# Runs in a worker process, so it only takes and returns plain data; a student
+# whose files cannot be read comes back as (student, error) instead.
+def student_gpas(job):
+    student, paths, bands, use_snapshot = job
+    try:
+        snapshot = open_snapshot(*paths[1:]) if use_snapshot else None
+        if snapshot is not None:
+            return student, snapshot_gpa_rows(student, paths[0], snapshot, GradingScale(bands)), None
+        return student, gpa_rows(student, paths, GradingScale(bands)), None
+    except (OSError, ValueError, csv.Error) as error:
+        return student, [], str(error)
+
+
+# A grades journal left by a crash is replayed but not compacted, so reading
+# a shard never writes to it
+def gpa_rows(student, paths, scale):
+    store = GradebookStore(*paths, autosave=False, journal=True)
+    aggregates = GpaAggregates(scale)
+    store.subscribe(aggregates)
+
+    rows = []
+    for semester in store.semester_names():
+        for course, credit, _ in store.course_rows(semester):
+            rows.append([student, "course", semester, course, credit,
+                         format_gpa(aggregates.course_gpa(semester, course))])
+        rows.append([student, "semester", semester, "", aggregates.semester_credits(semester),
+                     format_gpa(aggregates.semester_gpa(semester))])
+    rows.append([student, "cumulative", "", "", aggregates.total_credits(),
+                 format_gpa(aggregates.cumulative_gpa())])
+    return rows
+
+
+# The same rows as gpa_rows, from the student's columnar snapshot
+def snapshot_gpa_rows(student, semester_file, snapshot, scale):
+    course_gpas = snapshot.course_gpa_array(scale)
+    semester_gpas = snapshot.semester_gpas(scale)
+    by_semester = {}
+    for row in range(len(course_gpas)):
+        by_semester.setdefault(snapshot.arrays["course_semester"][row], []).append(row)
+
+    rows = []
+    for semester in dict.fromkeys(semester for semester, _ in parse_rows(semester_file, 2)):
+        credits = 0.0
+        for row in by_semester.get(snapshot.semester_codes.get(semester), []):
+            credit = float(snapshot.arrays["course_credit"][row])
+            gpa = course_gpas[row]
+            credits += credit
+            rows.append([student, "course", semester, snapshot.courses[snapshot.arrays["course_name"][row]],
+                         credit, format_gpa(None if gpa != gpa else float(gpa))])
+        rows.append([student, "semester", semester, "", credits, format_gpa(semester_gpas.get(semester))])
+    rows.append([student, "cumulative", "", "", snapshot.total_credits(),
+                 format_gpa(snapshot.cumulative_gpa(scale))])
+    return rows
+
+
+def format_gpa(gpa):
+    return "" if gpa is None else round(gpa, 4)
+
+
+# Compute every student's GPAs across a process pool into one CSV file.
+# Returns (students written, students that failed).
+# With use_snapshot, each student is read from a columnar snapshot of their files.
+def run_batch(data_dir, output, scale=DEFAULT_SCALE, workers=None, chunksize=16, use_snapshot=False):
+    bands = list(zip(scale.breakpoints, scale.grade_points))
+    profiles = ProfileStore(data_dir)
+    jobs = [(student, profiles.shard_files(student), bands, use_snapshot) for student in profiles.students()]
+    failed = 0
+
+    with open(output, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(RESULT_COLUMNS)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(student_gpas, jobs, chunksize=chunksize)
+            for done, (student, rows, error) in enumerate(results, start=1):
+                if error:
+                    failed += 1
+                    print(f"{student}: {error}", file=sys.stderr)
+                writer.writerows(rows)
+                if done % 100 == 0:
+                    print(f"{done}/{len(jobs)} students", file=sys.stderr)
+    return len(jobs) - failed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute course, semester and cumulative GPAs for many student gradebooks."
+    )
+    parser.add_argument("data_dir", help="data root with one subdirectory of CSV files per student")
+    parser.add_argument("--output", default="gpa_results.csv")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--scale", help="CSV grading scale with 'min' and 'point' columns")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="read each student through a columnar snapshot, rebuilt when the CSV files change")
+    args = parser.parse_args()
+    if not os.path.isdir(args.data_dir):
+        parser.error(f"{args.data_dir} is not a directory")
+
+    scale = GradingScale.from_file(args.scale) if args.scale else DEFAULT_SCALE
+    written, failed = run_batch(args.data_dir, args.output, scale, args.workers, use_snapshot=args.snapshot)
+    print(f"Wrote GPAs for {written} students to {args.output}", file=sys.stderr)
+    if failed:
+        sys.exit(f"{failed} students could not be read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import math
+
+from gradebook_records import number
+from grading_scale import DEFAULT_SCALE
+
+# Highest mark an item can get
+MAX_MARK = 100.0
+
+# Largest number of scenarios evaluated in one go
+MAX_SCENARIOS = 1_000_000
+
+
+# A course's syllabus items split into graded and ungraded, with the same
+# weights and rules as GpaAggregates: ungraded items count towards the total
+# weight, blank weights count as zero.
+class CoursePlan:
+    def __init__(self, rows, scale=DEFAULT_SCALE):
+        self.scale = scale
+        self.total_weight = 0.0
+        self.graded_points = 0.0  # Sum of weight * mark over graded items
+        self.ungraded = []        # [(syllabus, weight)]
+        for syllabus, weight, grade in rows:
+            weight = number(weight) or 0.0
+            mark = number(grade)
+            self.total_weight += weight
+            if mark is None:
+                self.ungraded.append((syllabus, weight))
+            else:
+                self.graded_points += weight * mark
+
+    @property
+    def ungraded_weight(self):
+        return sum(weight for _, weight in self.ungraded)
+
+    # Lowest mark needed on every ungraded item for the course average to
+    # reach average. Returns 0.0 if it is reached whatever the remaining
+    # marks are, and None if even MAX_MARK on everything falls short.
+    def mark_for_average(self, average):
+        if self.total_weight <= 0:
+            return None
+        remaining = self.ungraded_weight
+        needed = average * self.total_weight - self.graded_points
+        if remaining <= 0:
+            return 0.0 if needed <= 1e-9 else None
+        mark = max(needed / remaining, 0.0)
+        return mark if mark <= MAX_MARK + 1e-9 else None
+
+    # Lowest mark needed on every ungraded item for a course GPA of at least
+    # target_points, or None if it cannot be reached
+    def mark_for_gpa(self, target_points):
+        average = self.scale.min_mark_for(target_points)
+        return None if average is None else self.mark_for_average(average)
+
+    # Course GPA for each scenario. marks has one row per scenario and one
+    # column per ungraded item, in the order of self.ungraded.
+    def evaluate(self, marks):
+        import numpy as np
+
+        marks = np.asarray(marks, dtype=float).reshape(-1, len(self.ungraded))
+        if self.total_weight <= 0:
+            return np.full(len(marks), np.nan)
+        weights = np.array([weight for _, weight in self.ungraded])
+        averages = (self.graded_points + marks @ weights) / self.total_weight
+        # Same rounding as GpaAggregates.course_average before the band lookup
+        return self.scale.points_array(np.round(averages, 9))
+
+
+# Graded credits and credit * GPA of the semester's other courses
+def _other_courses(aggregates, semester, course):
+    credits = points = 0.0
+    for other in aggregates.semester_courses.get(semester, ()):
+        gpa = aggregates.course_gpa(semester, other)
+        if other != course and gpa is not None:
+            credit = aggregates.credits.get((semester, other), 0.0)
+            credits += credit
+            points += credit * gpa
+    return credits, points
+
+
+# Course GPA this course needs for its semester to reach target semester GPA,
+# with every other course keeping its current GPA. Returns None if no GPA up
+# to the top of the scale is enough, 0.0 if any GPA is.
+def course_points_for_semester(aggregates, semester, course, target):
+    credit = aggregates.credits.get((semester, course)) or 0.0
+    if credit <= 0:
+        return None
+    other_credits, other_points = _other_courses(aggregates, semester, course)
+    # Rounded so float error cannot push the need just past a band's points
+    needed = round((target * (other_credits + credit) - other_points) / credit, 9)
+    if needed <= 0:
+        return 0.0
+    return needed if needed <= max(aggregates.scale.grade_points) else None
+
+
+# Semester GPA for each course GPA in course_gpas, with the other courses of
+# the semester at their current GPA
+def semester_gpas_for(aggregates, semester, course, course_gpas):
+    import numpy as np
+
+    credit = aggregates.credits.get((semester, course)) or 0.0
+    other_credits, other_points = _other_courses(aggregates, semester, course)
+    course_gpas = np.asarray(course_gpas, dtype=float)
+    if other_credits + credit <= 0:
+        return np.full(len(course_gpas), np.nan)
+    return (other_points + credit * course_gpas) / (other_credits + credit)
+
+
+# Every combination of marks from low to high in steps of step, one column
+# per (low, high) range
+def grid_scenarios(ranges, step):
+    import numpy as np
+
+    if step <= 0:
+        raise ValueError("The grid step must be positive.")
+    # Size the grid the way np.arange will before allocating any of it
+    count = 1.0
+    for low, high in ranges:
+        count *= max(math.ceil(min((high - low) / step + 0.5, MAX_SCENARIOS + 1)), 0)
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"The grid has more than {MAX_SCENARIOS} scenarios; use a bigger step or Monte Carlo.")
+    axes = [np.arange(low, high + step / 2, step) for low, high in ranges]
+    if not axes:
+        return np.zeros((1, 0))
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+
+
+# count scenarios with each mark drawn uniformly from its (low, high) range
+def random_scenarios(ranges, count, seed=None):
+    import numpy as np
+
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"At most {MAX_SCENARIOS} scenarios can be evaluated at once.")
+    rng = np.random.default_rng(seed)
+    lows = np.array([low for low, _ in ranges], dtype=float)
+    highs = np.array([high for _, high in ranges], dtype=float)
+    return rng.uniform(lows, highs, size=(count, len(ranges)))
+
+
+# [(GPA, share of scenarios)] from the highest GPA down; NaN GPAs are left out
+def gpa_distribution(gpas):
+    import numpy as np
+
+    gpas = np.asarray(gpas, dtype=float)
+    gpas = gpas[~np.isnan(gpas)]
+    if not len(gpas):
+        return []
+    values, counts = np.unique(np.round(gpas, 6), return_counts=True)
+    return [(float(value), float(count / len(gpas))) for value, count in zip(values[::-1], counts[::-1])]
@@ -0,0 +1,138 @@
+import collections
+
+from gradebook_records import number
+from gradebook_store import GradebookListener
+from gradebook_validation import TERMS
+from grading_scale import DEFAULT_SCALE
+from instrumentation import span
+
+
+# Sort key putting semesters in the order they were taken: by year, then term.
+# Names that are not "<term> <year>" go last, by name.
+def semester_order(semester):
+    term, _, year = semester.partition(" ")
+    if term in TERMS and year.isdigit():
+        return (0, int(year), TERMS.index(term), semester)
+    return (1, 0, 0, semester)
+
+
+class CourseStats:
+    __slots__ = ("course", "credit", "gpa", "average", "total_weight", "graded_weight",
+                 "items", "graded_items", "distribution")
+
+    def __init__(self, course, credit):
+        self.course = course
+        self.credit = credit
+        self.gpa = None
+        self.average = None
+        self.total_weight = 0.0
+        self.graded_weight = 0.0
+        self.items = 0
+        self.graded_items = 0
+        self.distribution = collections.Counter()  # Grade points -> graded items earning them
+
+    # Share of the course's weight that has a grade, or None without weight
+    @property
+    def completion(self):
+        return self.graded_weight / self.total_weight if self.total_weight > 0 else None
+
+
+class SemesterStats:
+    __slots__ = ("semester", "courses", "credits", "graded_credits", "points")
+
+    def __init__(self, semester):
+        self.semester = semester
+        self.courses = []
+        self.credits = 0.0
+        self.graded_credits = 0.0
+        self.points = 0.0  # Sum of credit * GPA over courses with a GPA
+
+    @property
+    def gpa(self):
+        return self.points / self.graded_credits if self.graded_credits > 0 else None
+
+
+# Statistics of one semester, read from the store's courses and syllabus
+# items with the same rules as GpaAggregates
+def semester_stats(store, semester, scale=DEFAULT_SCALE):
+    stats = SemesterStats(semester)
+    for course, credit, _ in store.course_rows(semester):
+        course_stats = CourseStats(course, number(credit) or 0.0)
+        weighted_sum = 0.0
+        for _, weight, grade in store.syllabus_rows(semester, course):
+            weight, mark = number(weight), number(grade)
+            course_stats.items += 1
+            course_stats.total_weight += weight or 0.0
+            if mark is None:
+                continue
+            course_stats.graded_items += 1
+            course_stats.distribution[scale.points(mark)] += 1
+            if weight is not None:
+                course_stats.graded_weight += weight
+                weighted_sum += weight * mark
+        if course_stats.total_weight > 0:
+            course_stats.average = round(weighted_sum / course_stats.total_weight, 9)
+            course_stats.gpa = scale.points(course_stats.average)
+            stats.graded_credits += course_stats.credit
+            stats.points += course_stats.credit * course_stats.gpa
+        stats.credits += course_stats.credit
+        stats.courses.append(course_stats)
+    return stats
+
+
+# Per-semester statistics for the analytics window, kept between openings.
+# Store change hooks only mark the semester they touch as stale, so after a
+# grade edit the next trend() recomputes that one semester and reuses the
+# cached statistics of every other one.
+class AnalyticsCache(GradebookListener):
+    def __init__(self, store, scale=DEFAULT_SCALE):
+        self.store = store
+        self.scale = scale
+        self.stats = {}    # semester -> SemesterStats
+        self.stale = set()
+        self.recomputed = 0  # Semesters recomputed so far
+
+    def semester(self, semester):
+        if semester in self.stale or semester not in self.stats:
+            self.stats[semester] = semester_stats(self.store, semester, self.scale)
+            self.stale.discard(semester)
+            self.recomputed += 1
+        return self.stats[semester]
+
+    # [(SemesterStats, CGPA up to and including that semester)] in the order
+    # the semesters were taken
+    def trend(self):
+        with span("analytics_trend") as timing:
+            recomputed = self.recomputed
+            rows = []
+            graded_credits = points = 0.0
+            for semester in sorted(self.store.semester_names(), key=semester_order):
+                stats = self.semester(semester)
+                graded_credits += stats.graded_credits
+                points += stats.points
+                rows.append((stats, points / graded_credits if graded_credits > 0 else None))
+            timing.set(rows=len(rows), recomputed=self.recomputed - recomputed)
+        return rows
+
+    # Store hooks
+    def semester_added(self, semester):
+        self.stale.add(semester)
+
+    def semester_removed(self, semester):
+        self.stats.pop(semester, None)
+        self.stale.discard(semester)
+
+    def course_added(self, semester, course, credit):
+        self.stale.add(semester)
+
+    def course_removed(self, semester, course):
+        self.stale.add(semester)
+
+    def item_added(self, semester, course, syllabus, weight, grade):
+        self.stale.add(semester)
+
+    def item_removed(self, semester, course, syllabus):
+        self.stale.add(semester)
+
+    def grade_changed(self, semester, course, syllabus, grade):
+        self.stale.add(semester)
@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import queue
+import threading
+from http import HTTPStatus
+from urllib.parse import unquote, urlsplit
+
+from gpa_aggregates import GpaAggregates
+from gradebook_store import (
+    COURSE_COLUMNS,
+    GRADE_COLUMNS,
+    SEMESTER_COLUMNS,
+    GradebookStore,
+    ensure_header,
+)
+from gradebook_validation import (
+    course_error,
+    grade_error,
+    semester_name_error,
+    syllabus_item_error,
+)
+from grading_scale import DEFAULT_SCALE, GradingScale
+
+# The API only listens on this machine
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+# (method, path pattern, handler name); None in a pattern matches any one
+# path segment, which is passed to the handler
+ROUTES = [
+    ("GET", ("gpa",), "gpa"),
+    ("GET", ("semesters",), "list_semesters"),
+    ("POST", ("semesters",), "add_semester"),
+    ("GET", ("semesters", None), "get_semester"),
+    ("DELETE", ("semesters", None), "delete_semester"),
+    ("GET", ("semesters", None, "courses"), "list_courses"),
+    ("POST", ("semesters", None, "courses"), "add_course"),
+    ("GET", ("semesters", None, "courses", None), "get_course"),
+    ("DELETE", ("semesters", None, "courses", None), "delete_course"),
+    ("GET", ("semesters", None, "courses", None, "items"), "list_items"),
+    ("POST", ("semesters", None, "courses", None, "items"), "add_item"),
+    ("PUT", ("semesters", None, "courses", None, "items", None), "set_grade"),
+    ("DELETE", ("semesters", None, "courses", None, "items", None), "delete_item"),
+]
+
+
+# A request that cannot be served, answered with status and message
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# Calls waiting to run on the thread that owns the store, e.g. the Tk thread,
+# which runs them from its event loop with run_pending(). Calls that may
+# change the store are submitted with write=True.
+class OwnerCalls:
+    def __init__(self):
+        self.calls = queue.SimpleQueue()
+
+    def submit(self, function, *args, write=False):
+        future = concurrent.futures.Future()
+        self.calls.put((future, function, args, write))
+        return future
+
+    # Run every waiting call; returns how many of them were writes, so the
+    # owner only refreshes its views when something may have changed
+    def run_pending(self):
+        writes = 0
+        while True:
+            try:
+                future, function, args, write = self.calls.get_nowait()
+            except queue.Empty:
+                return writes
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function(*args))
+                except Exception as error:
+                    future.set_exception(error)
+                writes += write
+
+
+def _match(pattern, segments):
+    if len(pattern) != len(segments):
+        return None
+    captures = []
+    for part, segment in zip(pattern, segments):
+        if part is None:
+            captures.append(segment)
+        elif part != segment:
+            return None
+    return captures
+
+
+# Body field as stripped text; JSON numbers are accepted for numeric fields
+def _text(body, name, default=None):
+    value = body.get(name, default)
+    if value is None:
+        raise ApiError(400, f"'{name}' is required.")
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ApiError(400, f"'{name}' must be text or a number.")
+    return str(value).strip()
+
+
+# JSON API over a store and its GpaAggregates, served by ApiServer.
+# Requests are answered from the in-memory tables. Writes take a lock, so
+# they run one at a time and in arrival order; reads do not wait for it.
+# With an owner (OwnerCalls), reads and writes both run on the owner's
+# thread, so the store, its listeners and the window only ever change there
+# and a read never sees a change half made (GpaAggregates moves a course's
+# contribution out and back in over several steps). Every call waiting when
+# the owner polls runs in that one pass, so any number of concurrent reads
+# are answered from memory together, at the cost of waiting up to one poll
+# interval and running one after another on the owner's thread rather than
+# in parallel. Without an owner everything runs on the event loop's thread.
+# store and aggregates may be replaced, e.g. when the window switches student.
+class GradebookService:
+    def __init__(self, store, aggregates, owner=None):
+        self.store = store
+        self.aggregates = aggregates
+        self.owner = owner
+        self.write_lock = asyncio.Lock()
+
+    async def _on_owner(self, function, *args, write=False):
+        if self.owner is None:
+            return function(*args)
+        return await asyncio.wrap_future(self.owner.submit(function, *args, write=write))
+
+    async def _read(self, function, *args):
+        return await self._on_owner(function, *args)
+
+    async def _write(self, function, *args):
+        async with self.write_lock:
+            return await self._on_owner(function, *args, write=True)
+
+    # (status, JSON payload) for one request
+    async def handle(self, method, path, body=b""):
+        segments = [unquote(segment) for segment in path.strip("/").split("/")]
+        allowed = []
+        for route_method, pattern, name in ROUTES:
+            captures = _match(pattern, segments)
+            if captures is None:
+                continue
+            if route_method != method:
+                allowed.append(route_method)
+                continue
+            try:
+                handler = getattr(self, name)
+                if method == "GET":
+                    return 200, await self._read(handler, *captures)
+                payload = self._body(body)
+                result = await self._write(handler, *captures, payload)
+                return (201 if method == "POST" else 200), result
+            except ApiError as error:
+                return error.status, {"error": error.message}
+        if allowed:
+            return 405, {"error": f"Use {', '.join(allowed)} for {path}."}
+        return 404, {"error": f"No such endpoint: {path}"}
+
+    @staticmethod
+    def _body(body):
+        if not body:
+            return {}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise ApiError(400, "The request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise ApiError(400, "The request body must be a JSON object.")
+        return payload
+
+    # Lookups shared by the handlers
+    def _require_semester(self, semester):
+        if not self.store.has_semester(semester):
+            raise ApiError(404, f"No semester '{semester}'.")
+
+    def _require_course(self, semester, course):
+        self._require_semester(semester)
+        if not self.store.has_course(semester, course):
+            raise ApiError(404, f"No course '{course}' in '{semester}'.")
+
+    def _require_item(self, semester, course, syllabus):
+        self._require_course(semester, course)
+        if not self.store.has_syllabus_item(semester, course, syllabus):
+            raise ApiError(404, f"No syllabus item '{syllabus}' in '{course}'.")
+
+    def _semester(self, semester):
+        return {
+            "semester": semester,
+            "gpa": self.aggregates.semester_gpa(semester),
+            "credits": self.aggregates.semester_credits(semester),
+        }
+
+    def _course(self, semester, course, credit):
+        return {
+            "course": course,
+            "credit": credit,
+            "gpa": self.aggregates.course_gpa(semester, course),
+            "average": self.aggregates.course_average(semester, course),
+            "total_weight": self.aggregates.course_total_weight(semester, course),
+        }
+
+    def _item(self, semester, course, syllabus):
+        for name, weight, grade in self.store.syllabus_rows(semester, course):
+            if name == syllabus:
+                return {"syllabus": name, "weight": weight, "grade": grade}
+        raise ApiError(404, f"No syllabus item '{syllabus}' in '{course}'.")
+
+    # GPA
+    def gpa(self):
+        semester_gpas = {semester: self.aggregates.semester_gpa(semester) for semester in self.store.semester_names()}
+        return {
+            "cgpa": self.aggregates.cumulative_gpa(),
+            "credits": self.aggregates.total_credits(),
+            "semesters": semester_gpas,
+        }
+
+    # Semesters
+    def list_semesters(self):
+        return [self._semester(semester) for semester in self.store.semester_names()]
+
+    def get_semester(self, semester):
+        self._require_semester(semester)
+        return {**self._semester(semester), "courses": self.list_courses(semester)}
+
+    def add_semester(self, body):
+        semester = " ".join(_text(body, "semester").split())
+        error = semester_name_error(semester)
+        if error:
+            raise ApiError(400, error)
+        if self.store.has_semester(semester):
+            raise ApiError(409, f"The semester '{semester}' already exists.")
+        self.store.add_semester(semester)
+        return self._semester(semester)
+
+    def delete_semester(self, semester, body):
+        self._require_semester(semester)
+        self.store.delete_semester(semester)
+        return {"deleted": semester}
+
+    # Courses
+    def list_courses(self, semester):
+        self._require_semester(semester)
+        return [self._course(semester, course, credit) for course, credit, _ in self.store.course_rows(semester)]
+
+    def get_course(self, semester, course):
+        self._require_course(semester, course)
+        credit = next(credit for name, credit, _ in self.store.course_rows(semester) if name == course)
+        return {**self._course(semester, course, credit), "items": self.list_items(semester, course)}
+
+    def add_course(self, semester, body):
+        self._require_semester(semester)
+        course, credit = _text(body, "course"), _text(body, "credit")
+        error = course_error(course, credit)
+        if error:
+            raise ApiError(400, error)
+        if self.store.has_course(semester, course):
+            raise ApiError(409, f"The course '{course}' already exists in '{semester}'.")
+        self.store.add_course(semester, course, credit)
+        return self._course(semester, course, credit)
+
+    def delete_course(self, semester, course, body):
+        self._require_course(semester, course)
+        self.store.delete_course(semester, course)
+        return {"deleted": course}
+
+    # Syllabus items
+    def list_items(self, semester, course):
+        self._require_course(semester, course)
+        return [
+            {"syllabus": syllabus, "weight": weight, "grade": grade}
+            for syllabus, weight, grade in self.store.syllabus_rows(semester, course)
+        ]
+
+    def add_item(self, semester, course, body):
+        self._require_course(semester, course)
+        syllabus, weight, grade = _text(body, "syllabus"), _text(body, "weight"), _text(body, "grade", "")
+        error = syllabus_item_error(syllabus, weight) or grade_error(grade)
+        if error:
+            raise ApiError(400, error)
+        if self.store.has_syllabus_item(semester, course, syllabus):
+            raise ApiError(409, f"The syllabus item '{syllabus}' already exists in '{course}'.")
+        self.store.add_syllabus_item(semester, course, syllabus, weight, grade)
+        return self._item(semester, course, syllabus)
+
+    def set_grade(self, semester, course, syllabus, body):
+        self._require_item(semester, course, syllabus)
+        grade = _text(body, "grade")
+        error = grade_error(grade)
+        if error:
+            raise ApiError(400, error)
+        self.store.update_grade(semester, course, syllabus, grade)
+        return self._item(semester, course, syllabus)
+
+    def delete_item(self, semester, course, syllabus, body):
+        self._require_item(semester, course, syllabus)
+        self.store.delete_syllabus_item(semester, course, syllabus)
+        return {"deleted": syllabus}
+
+    # HTTP/1.1, one request per connection
+    async def serve_client(self, reader, writer):
+        try:
+            try:
+                method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if not 0 <= length <= MAX_BODY:
+                    raise ApiError(413, "The request body is too large.")
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.handle(method, urlsplit(target).path, body)
+            except ApiError as error:
+                status, payload = error.status, {"error": error.message}
+            except (ValueError, asyncio.IncompleteReadError):
+                status, payload = 400, {"error": "Malformed request."}
+            except Exception as error:
+                status, payload = 500, {"error": str(error)}
+
+            data = json.dumps(payload).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+# Listens for API requests on localhost, either in the calling thread
+# (serve_forever) or in a background thread of its own (start_thread)
+class ApiServer:
+    def __init__(self, service, host=API_HOST, port=API_PORT):
+        self.service = service
+        self.host = host
+        self.port = port  # 0 picks a free port; the real one is set on start
+        self.server = None
+        self.loop = None
+        self.thread = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.service.serve_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    # Serve from a daemon thread; returns once the port is open
+    def start_thread(self):
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.loop.run_until_complete(self.start())
+            except OSError as error:
+                errors.append(error)
+                ready.set()
+                return
+            ready.set()
+            self.loop.run_forever()
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="gradebook-api", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self.port
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a gradebook as a JSON API on localhost.")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--semesters", default="semesters.csv")
+    parser.add_argument("--courses", default="courses.csv")
+    parser.add_argument("--grades", default="grades.csv")
+    parser.add_argument("--scale", help="CSV grading scale with 'min' and 'point' columns")
+    args = parser.parse_args()
+
+    for file, columns in [(args.semesters, SEMESTER_COLUMNS),
+                          (args.courses, COURSE_COLUMNS),
+                          (args.grades, GRADE_COLUMNS)]:
+        ensure_header(file, columns)
+    store = GradebookStore(args.semesters, args.courses, args.grades)
+    aggregates = GpaAggregates(GradingScale.from_file(args.scale) if args.scale else DEFAULT_SCALE)
+    store.subscribe(aggregates)
+
+    server = ApiServer(GradebookService(store, aggregates), port=args.port)
+    print(f"Serving the gradebook on http://{API_HOST}:{args.port}/")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import collections
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+
+from gradebook_sqlite import SQLiteGradebookStore
+from gradebook_store import (
+    COURSE_COLUMNS,
+    GRADE_COLUMNS,
+    SEMESTER_COLUMNS,
+    GradebookStore,
+    ensure_header,
+)
+from gradebook_validation import (
+    course_error,
+    grade_error,
+    semester_name_error,
+    syllabus_item_error,
+)
+from instrumentation import span
+
+# Columns of an import or export file. Rows with a blank syllabus only add
+# their course (and rows with a blank course only their semester), so empty
+# semesters and courses survive an export and re-import.
+BULK_COLUMNS = GRADE_COLUMNS + ["credit"]
+
+# Rows applied per store batch, i.e. per write of the changed files
+CHUNK_ROWS = 5000
+
+# Columns of the rejects file written next to an import
+REJECT_COLUMNS = ["line", "error", "record"]
+
+
+def file_format(path, format=None):
+    return format or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+
+# Records of a CSV or JSONL file, read one line at a time.
+# Yields (line number, record), where a record is a dict of column -> value,
+# or None for a JSONL line that is not a JSON object. position is how many
+# bytes have been read so far, for progress reports.
+class RecordReader:
+    def __init__(self, path, format=None):
+        self.path = path
+        self.format = file_format(path, format)
+        self.size = os.path.getsize(path)
+        self.position = 0
+
+    # Decoded lines; utf-8-sig drops the byte order mark spreadsheet exports start with
+    def _lines(self, file):
+        for line in file:
+            self.position += len(line)
+            yield line.decode("utf-8-sig")
+
+    def __iter__(self):
+        with open(self.path, mode="rb") as file:
+            if self.format == "jsonl":
+                yield from self._json_records(self._lines(file))
+            else:
+                yield from self._csv_records(self._lines(file))
+
+    @staticmethod
+    def _csv_records(lines):
+        reader = csv.reader(lines)
+        header = [name.strip().lower() for name in next(reader, [])]
+        if "semester" not in header:
+            raise ValueError("The file has no 'semester' column in its header.")
+        for row in reader:
+            if any(value.strip() for value in row):
+                yield reader.line_num, dict(zip(header, row))
+
+    @staticmethod
+    def _json_records(lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+
+
+def _field(record, name):
+    value = record.get(name)
+    return "" if value is None else str(value).strip()
+
+
+# A record as (semester, course, credit, syllabus, weight, grade) text, checked
+# the way the window checks what is typed in. Returns (row, None) or (None, error).
+def check_record(record):
+    if record is None:
+        return None, "Not a JSON object."
+    semester = " ".join(_field(record, "semester").split())
+    course, credit = _field(record, "course"), _field(record, "credit")
+    syllabus, weight, grade = _field(record, "syllabus"), _field(record, "weight"), _field(record, "grade")
+    error = semester_name_error(semester)
+    if not error and course and credit:
+        error = course_error(course, credit)
+    if not error and syllabus:
+        error = (syllabus_item_error(syllabus, weight) if course else "A syllabus item needs a course.") \
+            or grade_error(grade)
+    return (None, error) if error else ((semester, course, credit, syllabus, weight, grade), None)
+
+
+# Add one checked row to the store, creating its semester and course when
+# they are new, and count what it added. A row that adds nothing counts as a
+# duplicate. Returns an error message if the row cannot be added.
+def _apply_row(store, row, counts):
+    semester, course, credit, syllabus, weight, grade = row
+    new_course = course and not store.has_course(semester, course)
+    if new_course:
+        error = course_error(course, credit)
+        if error:
+            return error  # A new course needs its credit
+    added = False
+    if not store.has_semester(semester):
+        store.add_semester(semester)
+        counts["semesters"] += 1
+        added = True
+    if new_course:
+        store.add_course(semester, course, credit)
+        counts["courses"] += 1
+        added = True
+    if syllabus and not store.has_syllabus_item(semester, course, syllabus):
+        store.add_syllabus_item(semester, course, syllabus, weight, grade)
+        counts["items"] += 1
+        added = True
+    if not added:
+        counts["duplicates"] += 1
+    return None
+
+
+# Stream records into the store, CHUNK_ROWS at a time. Each chunk is one store
+# batch, so the changed files are written (or the journal appended) once per
+# chunk and only one chunk of input is held in memory. Rows that already
+# exist are skipped, never overwritten; invalid rows are skipped and passed to
+# reject(line, error, record). progress(counts) runs after every chunk.
+# Returns the counts of rows read, added semesters, courses and items,
+# duplicates and invalid rows.
+def import_records(store, records, chunk_rows=CHUNK_ROWS, progress=None, reject=None):
+    counts = collections.Counter()
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        if not chunk:
+            return counts
+        with span("import_chunk", rows=len(chunk)), store.batch():
+            for line, record in chunk:
+                counts["rows"] += 1
+                row, error = check_record(record)
+                error = error or _apply_row(store, row, counts)
+                if error:
+                    counts["invalid"] += 1
+                    if reject:
+                        reject(line, error, record)
+        if progress:
+            progress(counts)
+
+
+# Every semester, course and syllabus item as BULK_COLUMNS rows, one course
+# at a time
+def export_rows(store):
+    for semester in store.semester_names():
+        courses = store.course_rows(semester)
+        if not courses:
+            yield semester, "", "", "", "", ""
+        for course, credit, _ in courses:
+            items = store.syllabus_rows(semester, course)
+            if not items:
+                yield semester, course, "", "", "", credit
+            for syllabus, weight, grade in items:
+                yield semester, course, syllabus, weight, grade, credit
+
+
+# Write export_rows to a CSV or JSONL file as they are produced. Returns the
+# number of rows written.
+def export_file(store, path, format=None):
+    count = 0
+    with span("export", path=path) as timing, open(path, mode="w", newline="", encoding="utf-8") as file:
+        if file_format(path, format) == "jsonl":
+            for row in export_rows(store):
+                file.write(json.dumps(dict(zip(BULK_COLUMNS, row))) + "\n")
+                count += 1
+        else:
+            writer = csv.writer(file)
+            writer.writerow(BULK_COLUMNS)
+            for row in export_rows(store):
+                writer.writerow(row)
+                count += 1
+        timing.set(rows=count)
+    return count
+
+
+def open_bulk_store(args):
+    if args.db:
+        return SQLiteGradebookStore(args.db)
+    for file, columns in [(args.semesters, SEMESTER_COLUMNS),
+                          (args.courses, COURSE_COLUMNS),
+                          (args.grades, GRADE_COLUMNS)]:
+        ensure_header(file, columns)
+    # Imported items go to the grades journal, appended once per chunk, and
+    # are folded into grades.csv once, when the store closes
+    return GradebookStore(args.semesters, args.courses, args.grades, journal=True, compact_bytes=math.inf)
+
+
+# Run the import or export command of main() against an open store
+def run_command(store, args):
+    if args.command == "export":
+        count = export_file(store, args.file, args.format)
+        print(f"Exported {count} rows to {args.file}", file=sys.stderr)
+        return
+
+    reader = RecordReader(args.file, args.format)
+
+    def progress(counts):
+        percent = 100 * reader.position / reader.size if reader.size else 100
+        print(f"\rImporting {args.file}: {percent:5.1f}% ({counts['rows']} rows)", end="", file=sys.stderr)
+
+    with open(args.rejects or os.devnull, mode="w", newline="", encoding="utf-8") as rejects_file:
+        rejects = csv.writer(rejects_file)
+        rejects.writerow(REJECT_COLUMNS)
+        counts = import_records(
+            store, reader, args.chunk_rows, progress,
+            lambda line, error, record: rejects.writerow([line, error, json.dumps(record)]),
+        )
+    print(file=sys.stderr)
+    print(
+        f"Added {counts['semesters']} semesters, {counts['courses']} courses and {counts['items']} "
+        f"syllabus items; skipped {counts['duplicates']} duplicate and {counts['invalid']} invalid rows",
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream syllabus items and grades into or out of a gradebook.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", help=f"CSV or JSONL file with the columns {', '.join(BULK_COLUMNS)}")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the extension)")
+    parser.add_argument("--rejects", help="CSV file listing the rows an import skipped as invalid")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--db", help="SQLite gradebook to use instead of the CSV files")
+    parser.add_argument("--semesters", default="semesters.csv")
+    parser.add_argument("--courses", default="courses.csv")
+    parser.add_argument("--grades", default="grades.csv")
+    args = parser.parse_args()
+
+    store = open_bulk_store(args)
+    try:
+        run_command(store, args)
+    except (OSError, ValueError) as error:
+        sys.exit(str(error))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import json
+import os
+
+from instrumentation import span
+
+
+# Append-only log of changes to grades.csv.
+# Each change is one JSON line; replaying the lines on top of grades.csv
+# rebuilds the current state. While a compaction is writing grades.csv the
+# journal is rotated to "<path>.old" so new changes keep going to a fresh file.
+class ChangeJournal:
+    def __init__(self, path):
+        self.path = path
+        self.old_path = path + ".old"
+
+    def append(self, record):
+        line = json.dumps(record) + "\n"
+        with span("journal_append", rows=1, bytes=len(line)):
+            with open(self.path, mode="a") as file:
+                file.write(line)
+
+    # Append several records with a single open and write
+    def append_many(self, records):
+        text = "".join(json.dumps(record) + "\n" for record in records)
+        with span("journal_append", rows=len(records), bytes=len(text)):
+            with open(self.path, mode="a") as file:
+                file.write(text)
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.old_path)
+
+    # Yield every record, oldest first. A torn last line from a crash is skipped.
+    def records(self):
+        for path in (self.old_path, self.path):
+            try:
+                with open(path, mode="r") as file:
+                    for line in file:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            break
+            except FileNotFoundError:
+                pass
+
+    # Start a compaction: later appends go to a new journal file
+    def rotate(self):
+        if os.path.exists(self.path):
+            os.replace(self.path, self.old_path)
+
+    # Finish a compaction: the rotated records are now part of grades.csv
+    def discard_rotated(self):
+        try:
+            os.remove(self.old_path)
+        except FileNotFoundError:
+            pass
+
+    # Everything is in grades.csv, drop both journal files
+    def clear(self):
+        self.discard_rotated()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,188 @@
+import csv
+import os
+from collections import OrderedDict
+
+from gpa_aggregates import GpaAggregates
+from gradebook_journal import ChangeJournal
+from gradebook_snapshot import open_snapshot
+from gradebook_store import (
+    COURSE_COLUMNS,
+    GRADE_COLUMNS,
+    SEMESTER_COLUMNS,
+    GradebookStore,
+    ensure_header,
+)
+from grading_scale import DEFAULT_SCALE
+from instrumentation import span
+
+SHARD_FILES = [
+    ("semesters.csv", SEMESTER_COLUMNS),
+    ("courses.csv", COURSE_COLUMNS),
+    ("grades.csv", GRADE_COLUMNS),
+]
+
+# Loaded student gradebooks kept in memory at once
+PROFILE_CAPACITY = 8
+
+
+# Yield the rows of a CSV file one at a time, padded to width, skipping the
+# header and blank rows. Nothing is cached, so a scan over every student's
+# files only ever holds one row in memory.
+def stream_rows(path, width):
+    try:
+        with open(path, mode="r", newline="") as file:
+            header = True
+            for row in csv.reader(file):
+                if not row:
+                    continue
+                if header and row[0].strip().lower() == "semester":
+                    continue
+                header = False
+                yield (row + [""] * width)[:width]
+    except FileNotFoundError:
+        return
+
+
+# Many student gradebooks under one data root, one directory (shard) per
+# student holding the usual semesters.csv, courses.csv and grades.csv.
+# open() loads a student's shard the first time it is asked for and keeps
+# the most recently used capacity profiles; the least recently used one is
+# written out and dropped, so memory stays flat however many students there
+# are. store_options are passed on to every GradebookStore (journal, writer,
+# ...). With snapshots=True, cross-student
+# queries read each shard's columnar snapshot instead of its CSV files.
+# A writer that finishes writes on another thread needs wait_for_writes: a
+# function that returns once every queued write has finished, so reopening
+# an evicted profile never reads files that are still being written.
+class ProfileStore:
+    def __init__(self, data_root, capacity=PROFILE_CAPACITY, snapshots=False, wait_for_writes=None,
+                 **store_options):
+        if capacity < 1:
+            raise ValueError("At least one profile must fit in memory.")
+        self.data_root = data_root
+        self.capacity = capacity
+        self.snapshots = snapshots
+        self.wait_for_writes = wait_for_writes
+        self.store_options = store_options
+        self.loaded = OrderedDict()  # student -> GradebookStore, least recently used first
+
+    def shard_dir(self, student):
+        if not student or student in (".", "..") or os.sep in student or (os.altsep and os.altsep in student):
+            raise ValueError(f"Invalid student name: {student!r}")
+        return os.path.join(self.data_root, student)
+
+    # Paths of a student's semesters.csv, courses.csv and grades.csv
+    def shard_files(self, student):
+        directory = self.shard_dir(student)
+        return [os.path.join(directory, name) for name, _ in SHARD_FILES]
+
+    # Every student with a shard, in name order
+    def students(self):
+        if not os.path.isdir(self.data_root):
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(self.data_root)
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, SHARD_FILES[0][0]))
+        )
+
+    def has_student(self, student):
+        return os.path.exists(self.shard_files(student)[0])
+
+    # Create an empty shard for a new student
+    def create(self, student):
+        if self.has_student(student):
+            raise ValueError(f"The student '{student}' already exists.")
+        os.makedirs(self.shard_dir(student), exist_ok=True)
+        for path, (_, columns) in zip(self.shard_files(student), SHARD_FILES):
+            ensure_header(path, columns)
+
+    # The student's gradebook, loading the shard if it is not in memory
+    def open(self, student):
+        store = self.loaded.get(student)
+        if store is not None:
+            self.loaded.move_to_end(student)
+            return store
+        if not self.has_student(student):
+            raise KeyError(student)
+
+        with span("open_profile", student=student):
+            paths = self.shard_files(student)
+            for path, (_, columns) in zip(paths, SHARD_FILES):
+                ensure_header(path, columns)
+            store = GradebookStore(*paths, **self.store_options)
+        self.loaded[student] = store
+        while len(self.loaded) > self.capacity:
+            self._evict(next(iter(self.loaded)))
+        return store
+
+    def is_loaded(self, student):
+        return student in self.loaded
+
+    def _evict(self, student):
+        store = self.loaded.pop(student)
+        store.close()
+        if self.wait_for_writes:
+            self.wait_for_writes()
+
+    # Write out and drop every loaded profile
+    def close(self):
+        for student in list(self.loaded):
+            self._evict(student)
+
+    # GPA totals for one semester of one student. A loaded profile answers
+    # from memory; any other shard is streamed, keeping only that semester's
+    # rows. A shard with a journal left by a crash is read in full instead, so
+    # the journal is replayed. That store is read-only and never joins the
+    # loaded profiles, so a scan cannot evict the profile being edited.
+    def semester_aggregates(self, student, semester, scale=DEFAULT_SCALE):
+        aggregates = GpaAggregates(scale)
+        store = self.loaded.get(student)
+        paths = self.shard_files(student)
+        if store is None and ChangeJournal(paths[2] + ".journal").exists():
+            store = GradebookStore(*paths, autosave=False, journal=True)
+
+        if store is not None:
+            if store.has_semester(semester):
+                aggregates.semester_added(semester)
+                for course, credit, _ in store.course_rows(semester):
+                    aggregates.course_added(semester, course, credit)
+                    for syllabus, weight, grade in store.syllabus_rows(semester, course):
+                        aggregates.item_added(semester, course, syllabus, weight, grade)
+            return aggregates
+
+        _, courses_file, grades_file = paths
+        aggregates.semester_added(semester)
+        courses = set()
+        for row_semester, course, credit, _ in stream_rows(courses_file, 4):
+            if row_semester == semester and course not in courses:
+                courses.add(course)
+                aggregates.course_added(semester, course, credit)
+        items = set()
+        for row_semester, course, syllabus, weight, grade in stream_rows(grades_file, 5):
+            if row_semester == semester and course in courses and (course, syllabus) not in items:
+                items.add((course, syllabus))
+                aggregates.item_added(semester, course, syllabus, weight, grade)
+        return aggregates
+
+    # One student's GPA for a semester, or None. Shards that are not loaded
+    # come from their snapshot when snapshots are on.
+    def semester_gpa(self, student, semester, scale=DEFAULT_SCALE):
+        if self.snapshots and student not in self.loaded:
+            snapshot = open_snapshot(*self.shard_files(student)[1:])
+            if snapshot is not None:
+                return snapshot.semester_gpa(semester, scale)
+        return self.semester_aggregates(student, semester, scale).semester_gpa(semester)
+
+    # Mean semester GPA over every student with a GPA for that semester.
+    # Shards are visited one at a time. Returns (average or None, students counted).
+    def class_average(self, semester, scale=DEFAULT_SCALE):
+        total = 0.0
+        count = 0
+        with span("class_average", semester=semester) as timing:
+            for student in self.students():
+                gpa = self.semester_gpa(student, semester, scale)
+                if gpa is not None:
+                    total += gpa
+                    count += 1
+            timing.set(rows=count)
+        return (total / count if count else None), count
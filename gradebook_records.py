@@ -0,0 +1,54 @@
+import functools
+import math
+import sys
+
+
+# Parse a numeric field, treating blanks and bad values as missing. "nan",
+# "inf" and overflowing values such as "1e400" count as bad: one of them in
+# a running sum would poison it for good.
+def parse_number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+# The same few texts ("20", "85", "0.5", ...) fill most numeric columns, so
+# each distinct text is parsed once and shares one float object
+@functools.lru_cache(maxsize=4096)
+def _parse_text(text):
+    return parse_number(text)
+
+
+def number(value):
+    return _parse_text(value) if isinstance(value, str) else parse_number(value)
+
+
+# Share one copy of a repeated name or value string across every row
+def intern_text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# Compact records kept in the store's indexes. The text is kept exactly as it
+# was read or entered, so files are written back unchanged. Readers turn it
+# into numbers with number(), which parses each distinct text once, so the
+# records do not carry parsed copies as well. Semesters only carry their
+# cgpa text, so the store keeps them as a plain semester -> cgpa mapping.
+class Course:
+    __slots__ = ("credit", "gpa")
+
+    def __init__(self, credit, gpa=""):
+        self.credit = intern_text(credit)
+        self.gpa = gpa
+
+
+class SyllabusItem:
+    __slots__ = ("weight", "grade")
+
+    def __init__(self, weight, grade=""):
+        self.weight = intern_text(weight)
+        self.set_grade(grade)
+
+    def set_grade(self, grade):
+        self.grade = intern_text(grade)
@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+
+from file_cache import file_signature
+from gradebook_records import number
+from gradebook_store import parse_rows
+from grading_scale import DEFAULT_SCALE
+from instrumentation import span
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = "gradebook.snapshot"
+
+# Column arrays of the two tables. Names are stored as integer codes into the
+# name lists in meta.json; each syllabus item also records the row of its
+# course in the courses table (-1 when courses.csv has no such course).
+COURSE_ARRAYS = {
+    "course_semester": "int32",
+    "course_name": "int32",
+    "course_credit": "float64",
+}
+GRADE_ARRAYS = {
+    "grade_semester": "int32",
+    "grade_course": "int32",
+    "grade_syllabus": "int32",
+    "grade_course_row": "int32",
+    "grade_weight": "float64",  # NaN when blank
+    "grade_mark": "float64",    # NaN while ungraded
+}
+
+
+def snapshot_path(grades_file):
+    return os.path.join(os.path.dirname(grades_file) or ".", SNAPSHOT_DIR)
+
+
+# Turn strings into small integer codes, remembering each distinct string once
+class _Codes:
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+# Signatures of the CSV files, as they are kept in meta.json
+def _sources(courses_file, grades_file):
+    return {
+        name: list(signature) if signature else None
+        for name, signature in (("courses", file_signature(courses_file)), ("grades", file_signature(grades_file)))
+    }
+
+
+def _number(value):
+    value = number(value)
+    return float("nan") if value is None else value
+
+
+# Read-only columnar copy of courses.csv and grades.csv.
+# The arrays are memory-mapped .npy files, so opening a snapshot costs a few
+# page faults and the GPA queries below run as whole-array numpy operations
+# without building a Python object per row. The CSV files stay the source of
+# truth; open_snapshot() rebuilds the snapshot whenever either one changes.
+# Duplicate courses and syllabus items keep their first row, as in
+# GradebookStore, and GPAs follow the same rules as GpaAggregates.
+class GradebookSnapshot:
+    def __init__(self, directory):
+        import numpy as np
+
+        with open(os.path.join(directory, "meta.json"), mode="r") as file:
+            meta = json.load(file)
+        self.sources = meta["sources"]
+        self.semesters = meta["semesters"]
+        self.courses = meta["courses"]
+        self.syllabus = meta["syllabus"]
+        self.semester_codes = {name: code for code, name in enumerate(self.semesters)}
+        self.arrays = {
+            name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+            for name in list(COURSE_ARRAYS) + list(GRADE_ARRAYS)
+        }
+
+    def __len__(self):
+        return len(self.arrays["grade_weight"])
+
+    # Parse the CSV files once and write the snapshot directory
+    @staticmethod
+    def build(courses_file, grades_file, directory):
+        import numpy as np
+
+        with span("build_snapshot", path=directory) as timing:
+            sources = _sources(courses_file, grades_file)
+            semesters, courses, syllabus = _Codes(), _Codes(), _Codes()
+            columns = {name: [] for name in list(COURSE_ARRAYS) + list(GRADE_ARRAYS)}
+
+            course_rows = {}
+            for semester, course, credit, _ in parse_rows(courses_file, 4):
+                key = (semesters.code(semester), courses.code(course))
+                if key in course_rows:
+                    continue
+                course_rows[key] = len(course_rows)
+                columns["course_semester"].append(key[0])
+                columns["course_name"].append(key[1])
+                columns["course_credit"].append(number(credit) or 0.0)
+
+            seen = set()
+            for semester, course, item, weight, grade in parse_rows(grades_file, 5):
+                key = (semesters.code(semester), courses.code(course), syllabus.code(item))
+                if key in seen:
+                    continue
+                seen.add(key)
+                columns["grade_semester"].append(key[0])
+                columns["grade_course"].append(key[1])
+                columns["grade_syllabus"].append(key[2])
+                columns["grade_course_row"].append(course_rows.get(key[:2], -1))
+                columns["grade_weight"].append(_number(weight))
+                columns["grade_mark"].append(_number(grade))
+
+            # Write into a scratch directory and swap it in, so readers never
+            # see half a snapshot
+            scratch = f"{directory}.{os.getpid()}.tmp"
+            shutil.rmtree(scratch, ignore_errors=True)
+            os.makedirs(scratch)
+            dtypes = {**COURSE_ARRAYS, **GRADE_ARRAYS}
+            for name, values in columns.items():
+                np.save(os.path.join(scratch, name + ".npy"), np.array(values, dtype=dtypes[name]))
+            meta = {
+                "version": SNAPSHOT_VERSION,
+                "sources": sources,
+                "semesters": semesters.names,
+                "courses": courses.names,
+                "syllabus": syllabus.names,
+            }
+            with open(os.path.join(scratch, "meta.json"), mode="w") as file:
+                json.dump(meta, file)
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(scratch, directory)
+            timing.set(rows=len(seen))
+
+    # Whether the snapshot in directory was built from the current CSV files
+    @staticmethod
+    def is_current(courses_file, grades_file, directory):
+        try:
+            with open(os.path.join(directory, "meta.json"), mode="r") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return False
+        return meta.get("version") == SNAPSHOT_VERSION and meta.get("sources") == _sources(courses_file, grades_file)
+
+    # Queries
+    # Course GPAs as one array over the course rows, NaN for courses without weight
+    def course_gpa_array(self, scale=DEFAULT_SCALE):
+        import numpy as np
+
+        arrays = self.arrays
+        course_count = len(arrays["course_credit"])
+        rows = np.asarray(arrays["grade_course_row"])
+        known = rows >= 0
+        weights = np.nan_to_num(arrays["grade_weight"])[known]
+        points = weights * np.nan_to_num(arrays["grade_mark"])[known]
+        total_weight = np.bincount(rows[known], weights=weights, minlength=course_count)
+        total_points = np.bincount(rows[known], weights=points, minlength=course_count)
+
+        graded = total_weight > 0
+        averages = np.zeros(course_count)
+        averages[graded] = np.round(total_points[graded] / total_weight[graded], 9)
+        return np.where(graded, scale.points_array(averages), np.nan)
+
+    # Per-semester (graded credits, credit * GPA, all credits) arrays indexed by semester code
+    def _semester_sums(self, scale):
+        import numpy as np
+
+        gpas = self.course_gpa_array(scale)
+        credits = np.asarray(self.arrays["course_credit"])
+        semesters = np.asarray(self.arrays["course_semester"])
+        graded = ~np.isnan(gpas)
+        size = len(self.semesters)
+        return (
+            np.bincount(semesters, weights=np.where(graded, credits, 0.0), minlength=size),
+            np.bincount(semesters, weights=np.where(graded, credits * np.nan_to_num(gpas), 0.0), minlength=size),
+            np.bincount(semesters, weights=credits, minlength=size),
+        )
+
+    # {(semester, course): gpa} for every course with syllabus weight
+    def course_gpas(self, scale=DEFAULT_SCALE):
+        gpas = self.course_gpa_array(scale)
+        semesters = self.arrays["course_semester"]
+        courses = self.arrays["course_name"]
+        return {
+            (self.semesters[semesters[row]], self.courses[courses[row]]): float(gpas[row])
+            for row in range(len(gpas)) if gpas[row] == gpas[row]
+        }
+
+    # {semester: gpa} for every semester with graded credits
+    def semester_gpas(self, scale=DEFAULT_SCALE):
+        graded_credits, points, _ = self._semester_sums(scale)
+        return {
+            name: float(points[code] / graded_credits[code])
+            for code, name in enumerate(self.semesters) if graded_credits[code] > 0
+        }
+
+    def semester_gpa(self, semester, scale=DEFAULT_SCALE):
+        code = self.semester_codes.get(semester)
+        if code is None:
+            return None
+        graded_credits, points, _ = self._semester_sums(scale)
+        return float(points[code] / graded_credits[code]) if graded_credits[code] > 0 else None
+
+    def semester_credits(self, semester):
+        import numpy as np
+
+        code = self.semester_codes.get(semester)
+        if code is None:
+            return 0.0
+        credits = np.asarray(self.arrays["course_credit"])
+        return float(credits[np.asarray(self.arrays["course_semester"]) == code].sum())
+
+    def total_credits(self):
+        return float(self.arrays["course_credit"].sum())
+
+    def cumulative_gpa(self, scale=DEFAULT_SCALE):
+        graded_credits, points, _ = self._semester_sums(scale)
+        total = graded_credits.sum()
+        return float(points.sum() / total) if total > 0 else None
+
+
+# The snapshot for a pair of CSV files, rebuilt first if either file changed.
+# Returns None while a grades journal exists: the CSV files are then not the
+# whole gradebook, so callers should open a GradebookStore instead.
+def open_snapshot(courses_file, grades_file, directory=None):
+    if os.path.exists(grades_file + ".journal") or os.path.exists(grades_file + ".journal.old"):
+        return None
+    directory = directory or snapshot_path(grades_file)
+    if not GradebookSnapshot.is_current(courses_file, grades_file, directory):
+        GradebookSnapshot.build(courses_file, grades_file, directory)
+    with span("open_snapshot", path=directory):
+        return GradebookSnapshot(directory)
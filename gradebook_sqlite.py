@@ -0,0 +1,270 @@
+import argparse
+import contextlib
+import csv
+import json
+import sqlite3
+import sys
+
+from gradebook_store import (
+    COURSE_COLUMNS,
+    GRADE_COLUMNS,
+    SEMESTER_COLUMNS,
+    read_rows,
+    write_rows,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS semesters (
+    semester TEXT PRIMARY KEY,
+    cgpa TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS courses (
+    semester TEXT NOT NULL,
+    course TEXT NOT NULL,
+    credit TEXT NOT NULL DEFAULT '',
+    gpa TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (semester, course)
+);
+CREATE TABLE IF NOT EXISTS grades (
+    semester TEXT NOT NULL,
+    course TEXT NOT NULL,
+    syllabus TEXT NOT NULL,
+    weight TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (semester, course, syllabus)
+);
+"""
+
+# Columns of each table, as in the CSV files
+TABLE_COLUMNS = {
+    "semesters": SEMESTER_COLUMNS,
+    "courses": COURSE_COLUMNS,
+    "grades": GRADE_COLUMNS,
+}
+
+
+# SQLite-backed gradebook with the same interface as GradebookStore.
+# Every mutation is a keyed statement in its own transaction, so a grade
+# edit touches one row instead of rewriting a whole file.
+class SQLiteGradebookStore:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.executescript(SCHEMA)
+        self.batch_depth = 0
+        self.listeners = []
+        self.duplicates = {"semesters": [], "courses": [], "grades": []}  # Rows import_csv skipped
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM semesters LIMIT 1").fetchone() is None
+
+    # Changes are committed as they happen, so there is nothing to write out
+    def flush(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # Group changes into one transaction, committed when the outermost batch
+    # ends. As with GradebookStore, whatever was applied is kept if the block fails.
+    @contextlib.contextmanager
+    def batch(self):
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def begin_batch(self):
+        self.batch_depth += 1
+
+    def end_batch(self):
+        self.batch_depth -= 1
+        if self.batch_depth == 0:
+            self.conn.commit()
+
+    # The transaction for one change: its own, or the surrounding batch's
+    def _transaction(self):
+        return contextlib.nullcontext() if self.batch_depth else self.conn
+
+    # Start sending change hooks to a listener, replaying the current contents
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        for semester in self.semester_names():
+            listener.semester_added(semester)
+        for semester, course, credit, _ in self.iter_courses().fetchall():
+            listener.course_added(semester, course, credit)
+        for row in self.iter_grades().fetchall():
+            listener.item_added(*row)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _notify(self, hook, *args):
+        for listener in self.listeners:
+            getattr(listener, hook)(*args)
+
+    def iter_courses(self):
+        return self.conn.execute("SELECT semester, course, credit, gpa FROM courses ORDER BY rowid")
+
+    def iter_grades(self):
+        return self.conn.execute("SELECT semester, course, syllabus, weight, grade FROM grades ORDER BY rowid")
+
+    # Semesters
+    def semester_names(self):
+        return [row[0] for row in self.conn.execute("SELECT semester FROM semesters ORDER BY rowid")]
+
+    def has_semester(self, semester):
+        query = "SELECT 1 FROM semesters WHERE semester = ?"
+        return self.conn.execute(query, (semester,)).fetchone() is not None
+
+    def add_semester(self, semester, cgpa=""):
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO semesters (semester, cgpa) VALUES (?, ?)", (semester, str(cgpa))
+            )
+        self._notify("semester_added", semester)
+
+    def set_semester_gpa(self, semester, cgpa):
+        with self._transaction():
+            self.conn.execute("UPDATE semesters SET cgpa = ? WHERE semester = ?", (str(cgpa), semester))
+
+    def set_semester_gpas(self, updates):
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE semesters SET cgpa = ? WHERE semester = ?",
+                ((str(cgpa), semester) for semester, cgpa in updates),
+            )
+
+    def delete_semester(self, semester):
+        # Cascade to courses and syllabus items in a single transaction
+        with self._transaction():
+            self.conn.execute("DELETE FROM grades WHERE semester = ?", (semester,))
+            self.conn.execute("DELETE FROM courses WHERE semester = ?", (semester,))
+            self.conn.execute("DELETE FROM semesters WHERE semester = ?", (semester,))
+        self._notify("semester_removed", semester)
+
+    # Courses
+    def course_rows(self, semester):
+        query = "SELECT course, credit, gpa FROM courses WHERE semester = ? ORDER BY rowid"
+        return self.conn.execute(query, (semester,)).fetchall()
+
+    def has_course(self, semester, course):
+        query = "SELECT 1 FROM courses WHERE semester = ? AND course = ?"
+        return self.conn.execute(query, (semester, course)).fetchone() is not None
+
+    def add_course(self, semester, course, credit, gpa=""):
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO courses (semester, course, credit, gpa) VALUES (?, ?, ?, ?)",
+                (semester, course, str(credit), str(gpa)),
+            )
+        self._notify("course_added", semester, course, str(credit))
+
+    def set_course_gpa(self, semester, course, gpa):
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE courses SET gpa = ? WHERE semester = ? AND course = ?", (str(gpa), semester, course)
+            )
+
+    def set_course_gpas(self, updates):
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE courses SET gpa = ? WHERE semester = ? AND course = ?",
+                ((str(gpa), semester, course) for semester, course, gpa in updates),
+            )
+
+    def delete_course(self, semester, course):
+        with self._transaction():
+            self.conn.execute("DELETE FROM grades WHERE semester = ? AND course = ?", (semester, course))
+            self.conn.execute("DELETE FROM courses WHERE semester = ? AND course = ?", (semester, course))
+        self._notify("course_removed", semester, course)
+
+    # Syllabus items
+    def syllabus_rows(self, semester, course):
+        query = "SELECT syllabus, weight, grade FROM grades WHERE semester = ? AND course = ? ORDER BY rowid"
+        return self.conn.execute(query, (semester, course)).fetchall()
+
+    def has_syllabus_item(self, semester, course, syllabus):
+        query = "SELECT 1 FROM grades WHERE semester = ? AND course = ? AND syllabus = ?"
+        return self.conn.execute(query, (semester, course, syllabus)).fetchone() is not None
+
+    def add_syllabus_item(self, semester, course, syllabus, weight, grade=""):
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO grades (semester, course, syllabus, weight, grade) VALUES (?, ?, ?, ?, ?)",
+                (semester, course, syllabus, str(weight), str(grade)),
+            )
+        self._notify("item_added", semester, course, syllabus, str(weight), str(grade))
+
+    def update_grade(self, semester, course, syllabus, grade):
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE grades SET grade = ? WHERE semester = ? AND course = ? AND syllabus = ?",
+                (str(grade), semester, course, syllabus),
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._notify("grade_changed", semester, course, syllabus, str(grade))
+        return True
+
+    def delete_syllabus_item(self, semester, course, syllabus):
+        with self._transaction():
+            self.conn.execute(
+                "DELETE FROM grades WHERE semester = ? AND course = ? AND syllabus = ?",
+                (semester, course, syllabus),
+            )
+        self._notify("item_removed", semester, course, syllabus)
+
+    # One-shot import of the existing CSV files; rows already present are kept.
+    # A row whose key is already taken, by the database or by an earlier row
+    # of the file, is skipped and kept in duplicates[table], which is returned.
+    def import_csv(self, semester_file, courses_file, grades_file):
+        paths = {"semesters": semester_file, "courses": courses_file, "grades": grades_file}
+        with self._transaction():
+            for table, columns in TABLE_COLUMNS.items():
+                statement = (f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                             f"VALUES ({', '.join('?' * len(columns))})")
+                skipped = self.duplicates[table] = []
+                for row in read_rows(paths[table], len(columns)):
+                    if self.conn.execute(statement, row).rowcount == 0:
+                        skipped.append(row)
+        return self.duplicates
+
+    # Write the database back out in the CSV layout the app has always used
+    def export_csv(self, semester_file, courses_file, grades_file):
+        write_rows(semester_file, SEMESTER_COLUMNS,
+                   self.conn.execute("SELECT semester, cgpa FROM semesters ORDER BY rowid"))
+        write_rows(courses_file, COURSE_COLUMNS, self.iter_courses())
+        write_rows(grades_file, GRADE_COLUMNS, self.iter_grades())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move a gradebook between CSV files and SQLite.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("db_file")
+    parser.add_argument("--semesters", default="semesters.csv")
+    parser.add_argument("--courses", default="courses.csv")
+    parser.add_argument("--grades", default="grades.csv")
+    parser.add_argument("--rejects", help="CSV file listing the rows an import skipped as duplicates")
+    args = parser.parse_args()
+
+    store = SQLiteGradebookStore(args.db_file)
+    if args.command == "import":
+        skipped = store.import_csv(args.semesters, args.courses, args.grades)
+        if args.rejects:
+            with open(args.rejects, mode="w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["table", "record"])
+                for table, rows in skipped.items():
+                    writer.writerows([table, json.dumps(dict(zip(TABLE_COLUMNS[table], row)))] for row in rows)
+        counts = ", ".join(f"{len(rows)} {table}" for table, rows in skipped.items())
+        print(f"Skipped duplicate rows: {counts}", file=sys.stderr)
+    else:
+        store.export_csv(args.semesters, args.courses, args.grades)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
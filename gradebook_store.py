@@ -0,0 +1,497 @@
+import contextlib
+import csv
+import os
+import shutil
+import sys
+import threading
+
+from file_cache import FILE_CACHE
+from gradebook_journal import ChangeJournal
+from gradebook_records import Course, SyllabusItem, intern_text
+from instrumentation import span
+
+# Column layout of the three gradebook files
+SEMESTER_COLUMNS = ["semester", "cgpa"]
+COURSE_COLUMNS = ["semester", "course", "credit", "gpa"]
+GRADE_COLUMNS = ["semester", "course", "syllabus", "weight", "grade"]
+
+# Fold the grades journal back into grades.csv once it grows past this size
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+
+# Parse every data row of a CSV file into a tuple, skipping the header and
+# blank lines. Values are interned, so repeated semester and course names
+# share one string across every row and every parsed copy of the file.
+def parse_rows(path, width):
+    rows = []
+    with span("read_csv", path=path) as timing:
+        try:
+            with open(path, mode="r", newline="") as file:
+                timing.set(bytes=os.fstat(file.fileno()).st_size)
+                with span("csv.reader", path=path) as scan:
+                    reader = csv.reader(file)
+                    for row in reader:
+                        if not row:
+                            continue
+                        if not rows and row[0].strip().lower() == "semester":
+                            continue  # Header row
+                        rows.append(tuple(map(sys.intern, (row + [""] * width)[:width])))
+                    scan.set(rows=len(rows))
+        except FileNotFoundError:
+            pass
+        timing.set(rows=len(rows))
+    return rows
+
+
+# Rows of a CSV file, parsed once per version of the file, for readers that
+# read the same file more than once without keeping their own copy.
+# The list is shared through the cache and must not be modified.
+def read_rows(path, width, cache=FILE_CACHE):
+    return cache.get(path, ("rows", width), lambda path: parse_rows(path, width))
+
+
+def _write_csv(path, columns, rows):
+    with span("write_csv", path=path, rows=len(rows)) as timing:
+        with open(path, mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+            timing.set(bytes=file.tell())
+
+
+# Make sure a CSV file starts with the expected header. Only the first line is
+# read; the file is rewritten (streamed through a temporary file) only when
+# that line really differs. Returns True if the file was created or rewritten.
+def ensure_header(path, columns, cache=FILE_CACHE):
+    header = ",".join(columns)
+    try:
+        with open(path, mode="r", newline="") as file:
+            first_line = file.readline()
+    except FileNotFoundError:
+        write_rows(path, columns, [], cache)
+        return True
+
+    if first_line.rstrip("\r\n") == header:
+        return False
+
+    line_end = "\r\n" if first_line.endswith("\r\n") else "\n"
+    has_header = first_line.split(",")[0].strip().lower() == "semester"
+    temp_path = path + ".tmp"
+    with span("rewrite_header", path=path):
+        with open(path, mode="r", newline="") as source, open(temp_path, mode="w", newline="") as target:
+            target.write(header + line_end)
+            if has_header:
+                source.readline()  # Replaced by the new header
+            shutil.copyfileobj(source, target)
+        os.replace(temp_path, path)
+    cache.invalidate(path)
+    return True
+
+
+# Write a header plus rows (any iterable) to a CSV file. Cached parses of
+# the file are dropped rather than refilled: the stores keep their own
+# indexes, so a second parsed copy of a table would only double its memory.
+def write_rows(path, columns, rows, cache=FILE_CACHE):
+    _write_csv(path, columns, list(rows))
+    cache.invalidate(path)
+
+
+# Write to a temporary file and rename it over the target, so readers and
+# crashes only ever see the old or the new file, never half of one
+def write_rows_atomic(path, columns, rows, cache=FILE_CACHE):
+    temp_path = path + ".tmp"
+    _write_csv(temp_path, columns, list(rows))
+    os.replace(temp_path, path)
+    cache.invalidate(path)
+
+
+# Base class for objects that follow gradebook changes (running GPA totals,
+# indexes, caches). Stores call these hooks after every mutation; subscribe()
+# first replays the current contents through them.
+class GradebookListener:
+    def semester_added(self, semester):
+        pass
+
+    def semester_removed(self, semester):
+        pass
+
+    def course_added(self, semester, course, credit):
+        pass
+
+    def course_removed(self, semester, course):
+        pass
+
+    def item_added(self, semester, course, syllabus, weight, grade):
+        pass
+
+    def item_removed(self, semester, course, syllabus):
+        pass
+
+    def grade_changed(self, semester, course, syllabus, grade):
+        pass
+
+
+# In-memory gradebook loaded once from the three CSV files.
+# Semesters are indexed by name, courses by semester and syllabus items by
+# (semester, course), so lookups and mutations never rescan a file.
+# With journal=True, syllabus item changes are appended to a small journal
+# instead of rewriting grades.csv, and compacted back in the background.
+# flush() hands each file's rows to writer(path, columns, rows); the rows are
+# a snapshot, so the writer may finish the job on another thread. The default
+# writer replaces each file atomically through a temporary file.
+class GradebookStore:
+    def __init__(self, semester_file, courses_file, grades_file, autosave=True, journal=False,
+                 compact_bytes=JOURNAL_COMPACT_BYTES, writer=write_rows_atomic):
+        self.files = {
+            "semesters": semester_file,
+            "courses": courses_file,
+            "grades": grades_file,
+        }
+        self.autosave = autosave
+        self.writer = writer
+        self.journal = ChangeJournal(grades_file + ".journal") if journal else None
+        self.compact_bytes = compact_bytes
+        self.compaction = None  # Background compaction thread, if one is running
+        self.semesters = {}   # semester -> cgpa
+        self._courses = None  # semester -> {course: Course}
+        self._grades = None   # semester -> {course: {syllabus: SyllabusItem}}
+        self.duplicates = {"semesters": [], "courses": [], "grades": []}
+        self.dirty = set()
+        self.removed = False  # Whether the unwritten changes delete anything
+        self.batch_depth = 0
+        self.pending_journal = []  # Journal records held back until the batch ends
+        self.listeners = []
+        self.load()
+
+    # Read semesters.csv now. courses.csv and grades.csv are read the first
+    # time they are needed, so opening the store does not depend on their size.
+    # A row repeating the key of an earlier one is left out of the indexes
+    # (the first row counts) and kept in duplicates[table]; duplicate rows
+    # are written back unchanged, so loading a file never loses what it holds.
+    # The files are parsed directly, not through FILE_CACHE: the indexes are
+    # the only copy of a table the store needs.
+    def load(self):
+        self.semesters = {}
+        self._courses = None
+        self._grades = None
+        self.duplicates = {"semesters": [], "courses": [], "grades": []}
+        self.dirty = set()
+
+        for row in parse_rows(self.files["semesters"], 2):
+            if row[0] in self.semesters:
+                self.duplicates["semesters"].append(row)
+            else:
+                self.semesters[row[0]] = row[1]
+
+    @property
+    def courses(self):
+        if self._courses is None:
+            self._courses = {}
+            self.duplicates["courses"] = []
+            for row in parse_rows(self.files["courses"], 4):
+                semester, course, credit, gpa = row
+                courses = self._courses.setdefault(semester, {})
+                if course in courses:
+                    self.duplicates["courses"].append(row)
+                else:
+                    courses[course] = Course(credit, gpa)
+        return self._courses
+
+    @property
+    def grades(self):
+        if self._grades is None:
+            self._grades = {}
+            self.duplicates["grades"] = []
+            for row in parse_rows(self.files["grades"], 5):
+                semester, course, syllabus, weight, grade = row
+                items = self._grades.setdefault(semester, {}).setdefault(course, {})
+                if syllabus in items:
+                    self.duplicates["grades"].append(row)
+                else:
+                    items[syllabus] = SyllabusItem(weight, grade)
+
+            # A journal left behind means the app stopped before compacting it.
+            # Without autosave it is only replayed, so reading writes nothing.
+            if self.journal and self.journal.exists():
+                for record in self.journal.records():
+                    self._apply(record)
+                if self.autosave:
+                    self.compact(background=False)
+        return self._grades
+
+    # Write every file touched since the last flush, each one once. Files are
+    # written parents first after additions and children first after
+    # deletions, so stopping between two files never leaves courses or
+    # syllabus items pointing at something that is gone.
+    def flush(self):
+        tables = ["semesters", "courses", "grades"]
+        if self.removed:
+            tables.reverse()
+        for table in tables:
+            if table not in self.dirty:
+                continue
+            if table == "semesters":
+                rows = [[semester, cgpa] for semester, cgpa in self.semesters.items()]
+                self.writer(self.files["semesters"], SEMESTER_COLUMNS, rows + self.duplicates["semesters"])
+            elif table == "courses":
+                self.writer(self.files["courses"], COURSE_COLUMNS,
+                            list(self.iter_courses()) + self.duplicates["courses"])
+            else:
+                self.writer(self.files["grades"], GRADE_COLUMNS, self._grade_rows())
+        self.dirty.clear()
+        self.removed = False
+
+    # Group changes so that every affected file is written once, when the
+    # outermost batch ends:
+    #     with store.batch():
+    #         store.add_syllabus_item(...)
+    #         store.add_syllabus_item(...)
+    # Changes apply to the store (and its listeners) straight away; there is
+    # no rollback, and whatever was applied is written even if the block fails.
+    # begin_batch()/end_batch() do the same for batches that span several
+    # calls, such as a grade edited one keystroke at a time.
+    @contextlib.contextmanager
+    def batch(self):
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def begin_batch(self):
+        self.batch_depth += 1
+
+    def end_batch(self):
+        self.batch_depth -= 1
+        if self.batch_depth > 0:
+            return
+        if self.pending_journal:
+            records, self.pending_journal = self.pending_journal, []
+            self.journal.append_many(records)
+            if self.journal.size() >= self.compact_bytes:
+                self.compact()
+        if self.autosave:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        if self.journal:
+            self.compact(background=False)
+
+    def _grade_rows(self):
+        return list(self.iter_grades()) + self.duplicates["grades"]
+
+    # Forget the duplicate rows of a deleted semester, course or syllabus item
+    def _drop_duplicates(self, table, *key):
+        rows = self.duplicates[table]
+        if rows:
+            self.duplicates[table] = [row for row in rows if tuple(row[:len(key)]) != key]
+
+    # Every course as (semester, course, credit, gpa)
+    def iter_courses(self):
+        for semester, courses in self.courses.items():
+            for course, record in courses.items():
+                yield semester, course, record.credit, record.gpa
+
+    # Every syllabus item as (semester, course, syllabus, weight, grade)
+    def iter_grades(self):
+        for semester, courses in self.grades.items():
+            for course, items in courses.items():
+                for syllabus, item in items.items():
+                    yield semester, course, syllabus, item.weight, item.grade
+
+    def _changed(self, *tables):
+        self.dirty.update(tables)
+        if self.autosave and not self.batch_depth:
+            self.flush()
+
+    # Record a change to the syllabus items table
+    def _grades_changed(self, record):
+        if not self.journal:
+            self._changed("grades")
+            return
+        if self.batch_depth:
+            self.pending_journal.append(record)
+            return
+        self.journal.append(record)
+        if self.journal.size() >= self.compact_bytes:
+            self.compact()
+
+    # Replay one journal record against the indexes
+    def _apply(self, record):
+        op = record.get("op")
+        semester_grades = self.grades.get(record.get("semester"), {})
+        if op == "add":
+            items = self.grades.setdefault(record["semester"], {}).setdefault(record["course"], {})
+            items[intern_text(record["syllabus"])] = SyllabusItem(record["weight"], record["grade"])
+        elif op == "grade":
+            item = semester_grades.get(record["course"], {}).get(record["syllabus"])
+            if item is not None:
+                item.set_grade(record["grade"])
+        elif op == "delete":
+            semester_grades.get(record["course"], {}).pop(record["syllabus"], None)
+            self._drop_duplicates("grades", record["semester"], record["course"], record["syllabus"])
+        elif op == "delete_course":
+            semester_grades.pop(record["course"], None)
+            self._drop_duplicates("grades", record["semester"], record["course"])
+        elif op == "delete_semester":
+            self.grades.pop(record["semester"], None)
+            self._drop_duplicates("grades", record["semester"])
+
+    # Fold the journal into grades.csv. The rows are snapshotted here, on the
+    # calling thread; only the file write runs in the background.
+    def compact(self, background=True):
+        if not self.journal:
+            return
+        if self.compaction is not None:
+            if background and self.compaction.is_alive():
+                return  # The next threshold crossing will pick up new records
+            self.compaction.join()
+            self.compaction = None
+        if not self.journal.exists():
+            return
+
+        if self.pending_journal:
+            self.journal.append_many(self.pending_journal)
+            self.pending_journal = []
+        rows = self._grade_rows()
+        self.journal.rotate()
+
+        def write():
+            write_rows_atomic(self.files["grades"], GRADE_COLUMNS, rows)
+            self.journal.discard_rotated()
+
+        if background:
+            self.compaction = threading.Thread(target=write, daemon=True)
+            self.compaction.start()
+        else:
+            write()
+            self.journal.clear()
+
+    # Start sending change hooks to a listener, replaying what is already loaded
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        for semester in self.semesters:
+            listener.semester_added(semester)
+        for semester, course, credit, _ in self.iter_courses():
+            listener.course_added(semester, course, credit)
+        for row in self.iter_grades():
+            listener.item_added(*row)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _notify(self, hook, *args):
+        for listener in self.listeners:
+            getattr(listener, hook)(*args)
+
+    # Semesters
+    def semester_names(self):
+        return list(self.semesters)
+
+    def has_semester(self, semester):
+        return semester in self.semesters
+
+    def add_semester(self, semester, cgpa=""):
+        semester = intern_text(semester)
+        self.semesters[semester] = cgpa
+        self._changed("semesters")
+        self._notify("semester_added", semester)
+
+    def set_semester_gpa(self, semester, cgpa):
+        if semester in self.semesters:
+            self.semesters[semester] = cgpa
+            self._changed("semesters")
+
+    # Set many semester GPAs with a single write of semesters.csv
+    def set_semester_gpas(self, updates):
+        for semester, cgpa in updates:
+            if semester in self.semesters:
+                self.semesters[semester] = cgpa
+        self._changed("semesters")
+
+    # Deletes cascade to courses and syllabus items, as one batch
+    def delete_semester(self, semester):
+        with self.batch():
+            self.removed = True
+            self.semesters.pop(semester, None)
+            self.courses.pop(semester, None)
+            self.grades.pop(semester, None)
+            for table in self.duplicates:
+                self._drop_duplicates(table, semester)
+            self._changed("semesters", "courses")
+            self._grades_changed({"op": "delete_semester", "semester": semester})
+        self._notify("semester_removed", semester)
+
+    # Courses
+    def course_rows(self, semester):
+        return [(course, record.credit, record.gpa) for course, record in self.courses.get(semester, {}).items()]
+
+    def has_course(self, semester, course):
+        return course in self.courses.get(semester, {})
+
+    def add_course(self, semester, course, credit, gpa=""):
+        semester, course = intern_text(semester), intern_text(course)
+        self.courses.setdefault(semester, {})[course] = Course(credit, gpa)
+        self._changed("courses")
+        self._notify("course_added", semester, course, credit)
+
+    def set_course_gpa(self, semester, course, gpa):
+        record = self.courses.get(semester, {}).get(course)
+        if record is not None:
+            record.gpa = gpa
+            self._changed("courses")
+
+    # Set many course GPAs with a single write of courses.csv
+    def set_course_gpas(self, updates):
+        for semester, course, gpa in updates:
+            record = self.courses.get(semester, {}).get(course)
+            if record is not None:
+                record.gpa = gpa
+        self._changed("courses")
+
+    def delete_course(self, semester, course):
+        with self.batch():
+            self.removed = True
+            self.courses.get(semester, {}).pop(course, None)
+            self.grades.get(semester, {}).pop(course, None)
+            self._drop_duplicates("courses", semester, course)
+            self._drop_duplicates("grades", semester, course)
+            self._changed("courses")
+            self._grades_changed({"op": "delete_course", "semester": semester, "course": course})
+        self._notify("course_removed", semester, course)
+
+    # Syllabus items
+    def syllabus_rows(self, semester, course):
+        items = self.grades.get(semester, {}).get(course, {})
+        return [(syllabus, item.weight, item.grade) for syllabus, item in items.items()]
+
+    def has_syllabus_item(self, semester, course, syllabus):
+        return syllabus in self.grades.get(semester, {}).get(course, {})
+
+    def add_syllabus_item(self, semester, course, syllabus, weight, grade=""):
+        semester, course = intern_text(semester), intern_text(course)
+        items = self.grades.setdefault(semester, {}).setdefault(course, {})
+        items[intern_text(syllabus)] = SyllabusItem(weight, grade)
+        self._grades_changed({
+            "op": "add", "semester": semester, "course": course,
+            "syllabus": syllabus, "weight": weight, "grade": grade,
+        })
+        self._notify("item_added", semester, course, syllabus, weight, grade)
+
+    def update_grade(self, semester, course, syllabus, grade):
+        item = self.grades.get(semester, {}).get(course, {}).get(syllabus)
+        if item is None:
+            return False
+        item.set_grade(grade)
+        self._grades_changed({
+            "op": "grade", "semester": semester, "course": course, "syllabus": syllabus, "grade": grade,
+        })
+        self._notify("grade_changed", semester, course, syllabus, grade)
+        return True
+
+    def delete_syllabus_item(self, semester, course, syllabus):
+        self.grades.get(semester, {}).get(course, {}).pop(syllabus, None)
+        self._drop_duplicates("grades", semester, course, syllabus)
+        self._grades_changed({"op": "delete", "semester": semester, "course": course, "syllabus": syllabus})
+        self._notify("item_removed", semester, course, syllabus)
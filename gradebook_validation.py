@@ -0,0 +1,39 @@
+from gradebook_records import number
+
+# Terms a semester can be created for, and the credit values a course can have
+TERMS = ["Winter", "Summer", "Fall"]
+COURSE_CREDITS = ["0.5", "1.0"]
+
+
+# Input checks shared by the window, the API and bulk imports. Each returns
+# None when the input is valid and otherwise the message to show.
+def semester_error(term, year):
+    if term not in TERMS or not year.isdigit():
+        return "Please select a term and enter a valid year."
+    return None
+
+
+# "Fall 2024" -> the semester_error of its term and year
+def semester_name_error(semester):
+    term, _, year = semester.partition(" ")
+    return semester_error(term, year)
+
+
+def course_error(course, credit):
+    if not course or credit not in COURSE_CREDITS:
+        return "Please enter a valid course name and select a valid credit type."
+    return None
+
+
+def syllabus_item_error(syllabus, weight):
+    if not syllabus or not weight.isdigit():
+        return "Please enter a valid syllabus item and weight."
+    return None
+
+
+# Grades are finite numbers (number() rejects nan and inf); a blank grade
+# means not graded yet
+def grade_error(grade):
+    if grade and number(grade) is None:
+        return f"'{grade}' is not a valid grade."
+    return None
@@ -0,0 +1,63 @@
+import bisect
+import csv
+
+# Lowest mark of each band and the grade points it earns
+DEFAULT_BANDS = [
+    (90, 4.0), (85, 3.9), (80, 3.7), (75, 3.3), (70, 3.0),
+    (65, 2.7), (60, 2.3), (50, 1.7), (0, 0.0),
+]
+
+
+# Grading scale built once and shared by every GPA calculation.
+# Bands are stored as sorted lower bounds, so a mark falls into the band of
+# the highest lower bound it reaches; fractional marks such as 89.5 land in
+# the band below instead of falling between "Max" and the next "Min".
+class GradingScale:
+    def __init__(self, bands=DEFAULT_BANDS):
+        bands = sorted((float(minimum), float(point)) for minimum, point in bands)
+        if not bands:
+            raise ValueError("A grading scale needs at least one band.")
+        self.breakpoints = [minimum for minimum, _ in bands]
+        self.grade_points = [point for _, point in bands]
+        self._arrays = None
+
+    # Load a scale from a CSV file with "min" and "point" columns
+    @classmethod
+    def from_file(cls, path):
+        bands = []
+        with open(path, mode="r", newline="") as file:
+            reader = csv.DictReader(file)
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            for row in reader:
+                bands.append((row["min"], row["point"]))
+        return cls(bands)
+
+    # Grade points for a single mark
+    def points(self, mark):
+        mark = float(mark)
+        if mark != mark:  # NaN, e.g. an ungraded item
+            return 0.0
+        index = bisect.bisect_right(self.breakpoints, mark) - 1
+        return self.grade_points[index] if index >= 0 else 0.0
+
+    # Grade points for a whole array of marks at once
+    def points_array(self, marks):
+        import numpy as np
+
+        if self._arrays is None:
+            # Slot 0 catches marks below the lowest band
+            self._arrays = (np.array(self.breakpoints), np.array([0.0] + self.grade_points))
+        breakpoints, grade_points = self._arrays
+        marks = np.asarray(marks, dtype=float)
+        result = grade_points[np.searchsorted(breakpoints, marks, side="right")]
+        return np.where(np.isnan(marks), 0.0, result)
+
+    # Lowest mark that earns at least the given grade points, or None
+    def min_mark_for(self, target_points):
+        for minimum, point in zip(self.breakpoints, self.grade_points):
+            if point >= target_points:
+                return minimum
+        return None
+
+
+DEFAULT_SCALE = GradingScale()
@@ -0,0 +1,157 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Set to a file path to record a trace for the whole process
+TRACE_ENV = "GRADEBOOK_TRACE"
+
+
+# One timed region. Callers attach sizes with span.set(rows=..., bytes=...).
+class Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, end, self.args)
+        return False
+
+
+# Stand-in used while tracing is off, so instrumented code costs next to nothing
+class NullSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+# Collects spans from every thread and writes them as a Chrome trace-event
+# JSON file (loadable in chrome://tracing or Perfetto) when the process exits,
+# followed by a per-span summary table on stderr.
+class Tracer:
+    def __init__(self):
+        self.path = None
+        self.events = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        if self.path is None:
+            atexit.register(self.finish)
+        self.path = path
+
+    def span(self, name, **args):
+        if self.path is None:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, args):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def write(self):
+        with self.lock:
+            events = list(self.events)
+        with open(self.path, mode="w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, default=str)
+
+    # Rows of (name, count, total ms, mean ms, max ms, rows, bytes), slowest first
+    def summary(self):
+        totals = {}
+        with self.lock:
+            events = list(self.events)
+        for event in events:
+            entry = totals.setdefault(event["name"], [0, 0.0, 0.0, 0, 0])
+            duration = event["dur"] / 1000
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+            entry[3] += event["args"].get("rows", 0) or 0
+            entry[4] += event["args"].get("bytes", 0) or 0
+        rows = [
+            (name, count, total, total / count, longest, row_count, byte_count)
+            for name, (count, total, longest, row_count, byte_count) in totals.items()
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def print_summary(self, file=sys.stderr):
+        header = f"{'span':<32} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'rows':>10} {'bytes':>12}"
+        print(header, file=file)
+        print("-" * len(header), file=file)
+        for name, count, total, mean, longest, rows, byte_count in self.summary():
+            print(f"{name:<32} {count:>7} {total:>10.2f} {mean:>9.3f} {longest:>9.3f} {rows:>10} {byte_count:>12}",
+                  file=file)
+
+    def finish(self):
+        if self.path is None:
+            return
+        self.write()
+        self.print_summary()
+        print(f"Trace written to {self.path}", file=sys.stderr)
+
+
+TRACER = Tracer()
+
+
+def enable_tracing(path):
+    TRACER.enable(path)
+
+
+def span(name, **args):
+    return TRACER.span(name, **args)
+
+
+# Decorator: time every call of a function as a span named after it
+def traced(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if TRACER.path is None:
+            return function(*args, **kwargs)
+        with TRACER.span(function.__name__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+if os.environ.get(TRACE_ENV):
+    enable_tracing(os.environ[TRACE_ENV])
@@ -0,0 +1,77 @@
+import collections
+import queue
+import threading
+
+
+# Background thread that performs file writes off the Tk event loop.
+# Writes are keyed by path: if a file is queued again before the worker gets
+# to it, only the latest write runs, and it moves to the back of the queue.
+# Writes therefore run in the order of their latest submit(), so a store
+# flush that queues children before parents is written in that order even
+# when older writes of the same files were still waiting. Completion
+# callbacks are not called on the worker thread; the owner calls poll() from
+# its own loop (Tk: root.after) to run them on the main thread.
+class PersistenceWorker:
+    def __init__(self):
+        self.jobs = queue.Queue()  # One token per waiting write; None stops the thread
+        self.results = queue.Queue()
+        self.pending = collections.OrderedDict()  # path -> (write, on_done), in run order
+        self.lock = threading.Lock()
+        self.active = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Queue write() for path, replacing any write for it that has not started yet
+    def submit(self, path, write, on_done=None):
+        with self.lock:
+            queued = path in self.pending
+            self.pending[path] = (write, on_done)
+            self.pending.move_to_end(path)
+            self.active += 0 if queued else 1
+        if not queued:
+            self.jobs.put(True)
+
+    def busy(self):
+        with self.lock:
+            return self.active > 0
+
+    def _run(self):
+        while True:
+            if self.jobs.get() is None:
+                self.jobs.task_done()
+                return
+            with self.lock:
+                path, (write, on_done) = self.pending.popitem(last=False)
+            error = None
+            try:
+                write()
+            except Exception as e:  # Reported back on the main thread
+                error = e
+            with self.lock:
+                self.active -= 1
+            self.results.put((path, on_done, error))
+            self.jobs.task_done()
+
+    # Run completion callbacks on the calling thread; returns any write errors
+    def poll(self):
+        errors = []
+        while True:
+            try:
+                path, on_done, error = self.results.get_nowait()
+            except queue.Empty:
+                return errors
+            if error is not None:
+                errors.append((path, error))
+            if on_done:
+                on_done(error)
+
+    # Block until every queued write has finished
+    def flush(self):
+        self.jobs.join()
+        return self.poll()
+
+    def stop(self):
+        errors = self.flush()
+        self.jobs.put(None)
+        self.thread.join()
+        return errors
@@ -0,0 +1,160 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Rows inserted per idle callback when filling a list
+FILL_CHUNK = 500
+
+
+# Scrollable list of records backed by a ttk.Treeview.
+# Rows are Treeview items rather than a Frame of widgets each, so Tk only
+# draws the rows that are on screen. Per-row actions are buttons under the
+# list that act on the selected row, and editable columns get an Entry
+# placed over the cell on double-click.
+#   columns:  [(name, heading, width), ...]
+#   actions:  [(button text, callback(row_id), text colour or None), ...]
+#             The first action also runs on double-click of a read-only cell.
+#   editable: {column name: callback(row_id, value) -> False to reject}
+#   live:     {column name: callback(row_id, value)}, called on every change
+#             while a cell of that column is being edited; Escape calls it
+#             again with the original value
+class RecordList(tk.Frame):
+    def __init__(self, master, columns, actions=(), editable=None, live=None, height=15):
+        super().__init__(master)
+        self.columns = [name for name, _, _ in columns]
+        self.actions = list(actions)
+        self.editable = editable or {}
+        self.live = live or {}
+        self.editor = None
+        self.pending_rows = []
+
+        button_bar = tk.Frame(self)
+        button_bar.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        for text, command, colour in reversed(self.actions):
+            button = tk.Button(
+                button_bar, text=text, font=("Arial", 10), fg=colour or "black",
+                command=lambda command=command: self._run_on_selection(command)
+            )
+            button.pack(side=tk.RIGHT, padx=5)
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height, selectmode="browse")
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading, anchor="w")
+            self.tree.column(name, width=width, anchor="w")
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._scroll)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Double-1>", self._on_double_click)
+
+    # Rows
+    def add_row(self, row_id, values):
+        self.tree.insert("", tk.END, iid=row_id, values=values)
+
+    # Insert the first chunk now and the rest on idle, so a window with
+    # thousands of rows opens straight away
+    def fill(self, rows):
+        self.pending_rows.extend(rows)
+        self._fill_chunk()
+
+    def _fill_chunk(self):
+        chunk, self.pending_rows = self.pending_rows[:FILL_CHUNK], self.pending_rows[FILL_CHUNK:]
+        for row_id, values in chunk:
+            if not self.tree.exists(row_id):
+                self.add_row(row_id, values)
+        if self.pending_rows:
+            self.after_idle(self._fill_chunk)
+
+    def remove_row(self, row_id):
+        self.pending_rows = [row for row in self.pending_rows if row[0] != row_id]
+        if self.tree.exists(row_id):
+            self.tree.delete(row_id)
+
+    # Remove every row, including any still waiting to be filled in
+    def clear(self):
+        self.pending_rows = []
+        self._close_editor()
+        self.tree.delete(*self.tree.get_children())
+
+    def has_row(self, row_id):
+        return self.tree.exists(row_id)
+
+    # Ids of every row, including any still waiting to be filled in
+    def row_ids(self):
+        return list(self.tree.get_children()) + [row_id for row_id, _ in self.pending_rows]
+
+    def value(self, row_id, column):
+        return self.tree.set(row_id, column)
+
+    def set_value(self, row_id, column, value):
+        if self.tree.exists(row_id):
+            self.tree.set(row_id, column, value)
+
+    def selected(self):
+        selection = self.tree.selection()
+        return selection[0] if selection else None
+
+    # Inline editing
+    def edit_cell(self, row_id, column):
+        self._close_editor()
+        self.tree.see(row_id)
+        self.tree.update_idletasks()
+        box = self.tree.bbox(row_id, column)
+        if not box:
+            return
+        x, y, width, height = box
+
+        original = self.tree.set(row_id, column)
+        text = tk.StringVar(value=original)
+        entry = tk.Entry(self.tree, textvariable=text, font=("Arial", 11))
+        entry.select_range(0, tk.END)
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+        self.editor = entry
+
+        def commit(event=None):
+            if self.editor is not entry:
+                return  # Already committed or cancelled
+            value = entry.get().strip()
+            self._close_editor()
+            if self.editable[column](row_id, value) is not False:
+                self.set_value(row_id, column, value)
+            elif column in self.live:
+                self.live[column](row_id, original)
+
+        def cancel(event=None):
+            self._close_editor()
+            if column in self.live:
+                self.live[column](row_id, original)
+
+        if column in self.live:
+            text.trace_add("write", lambda *args: self.live[column](row_id, text.get().strip()))
+        entry.bind("<Return>", commit)
+        entry.bind("<KP_Enter>", commit)
+        entry.bind("<FocusOut>", commit)
+        entry.bind("<Escape>", cancel)
+
+    def _close_editor(self):
+        if self.editor is not None:
+            editor, self.editor = self.editor, None
+            editor.destroy()
+
+    def _scroll(self, *args):
+        self._close_editor()  # The cell moves away from under the editor
+        self.tree.yview(*args)
+
+    def _on_double_click(self, event):
+        row_id = self.tree.identify_row(event.y)
+        column_id = self.tree.identify_column(event.x)
+        if not row_id or not column_id:
+            return
+        column = self.columns[int(column_id[1:]) - 1]
+        if column in self.editable:
+            self.edit_cell(row_id, column)
+        elif self.actions:
+            self.actions[0][1](row_id)
+
+    def _run_on_selection(self, command):
+        row_id = self.selected()
+        if row_id is not None:
+            command(row_id)
@@ -0,0 +1,113 @@
+import bisect
+import heapq
+import itertools
+
+from gradebook_store import GradebookListener
+
+# Most results returned by one search
+SEARCH_LIMIT = 50
+
+
+def _trigrams(text):
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+# Search over semester names, course codes and syllabus item names, kept up
+# to date from store change hooks like GpaAggregates.
+# Every distinct lower-cased name (a "term") maps to the entries carrying it,
+# in the order they were added (a dict used as an ordered set).
+# Entries are (semester, course, syllabus) tuples, with course and syllabus
+# None for semesters and syllabus None for courses. Terms are kept sorted for
+# prefix lookups with bisect, and each term is filed under its three-letter
+# substrings, so a substring search only checks terms sharing all of the
+# query's trigrams instead of every name in the gradebook.
+class SearchIndex(GradebookListener):
+    def __init__(self):
+        self.terms = {}       # term -> {entry: None}
+        self.sorted_terms = []
+        self.trigrams = {}    # trigram -> set of terms
+        self.courses = {}     # semester -> {course: set of syllabus items}
+
+    # Index maintenance
+    def _add(self, name, entry):
+        term = name.lower()
+        entries = self.terms.get(term)
+        if entries is None:
+            entries = self.terms[term] = {}
+            bisect.insort(self.sorted_terms, term)
+            for trigram in _trigrams(term):
+                self.trigrams.setdefault(trigram, set()).add(term)
+        entries[entry] = None
+
+    def _remove(self, name, entry):
+        term = name.lower()
+        entries = self.terms.get(term)
+        if entries is None:
+            return
+        entries.pop(entry, None)
+        if entries:
+            return
+        del self.terms[term]
+        del self.sorted_terms[bisect.bisect_left(self.sorted_terms, term)]
+        for trigram in _trigrams(term):
+            terms = self.trigrams.get(trigram)
+            terms.discard(term)
+            if not terms:
+                del self.trigrams[trigram]
+
+    # Queries
+    # Entries whose name starts with the query, then entries whose name
+    # contains it (for queries of three characters or more)
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        if not query:
+            return []
+        terms = []
+        index = bisect.bisect_left(self.sorted_terms, query)
+        while index < len(self.sorted_terms) and len(terms) < limit:
+            term = self.sorted_terms[index]
+            if not term.startswith(query):
+                break
+            terms.append(term)
+            index += 1
+
+        if len(query) >= 3 and len(terms) < limit:
+            postings = sorted((self.trigrams.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+            candidates = set.intersection(*postings) if postings else set()
+            matches = (term for term in candidates if query in term and not term.startswith(query))
+            terms += heapq.nsmallest(limit - len(terms), matches)
+
+        results = []
+        for term in terms:
+            results += itertools.islice(self.terms[term], limit - len(results))
+            if len(results) >= limit:
+                break
+        return results
+
+    # Store hooks
+    def semester_added(self, semester):
+        self._add(semester, (semester, None, None))
+        self.courses.setdefault(semester, {})
+
+    def semester_removed(self, semester):
+        for course in list(self.courses.get(semester, {})):
+            self.course_removed(semester, course)
+        self.courses.pop(semester, None)
+        self._remove(semester, (semester, None, None))
+
+    def course_added(self, semester, course, credit):
+        self._add(course, (semester, course, None))
+        self.courses.setdefault(semester, {}).setdefault(course, set())
+
+    def course_removed(self, semester, course):
+        for syllabus in self.courses.get(semester, {}).pop(course, set()):
+            self._remove(syllabus, (semester, course, syllabus))
+        self._remove(course, (semester, course, None))
+
+    def item_added(self, semester, course, syllabus, weight, grade):
+        self._add(syllabus, (semester, course, syllabus))
+        self.courses.setdefault(semester, {}).setdefault(course, set()).add(syllabus)
+
+    def item_removed(self, semester, course, syllabus):
+        self.courses.get(semester, {}).get(course, set()).discard(syllabus)
+        self._remove(syllabus, (semester, course, syllabus))
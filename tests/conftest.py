@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# The gradebook modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gradebook_store import COURSE_COLUMNS, GRADE_COLUMNS, SEMESTER_COLUMNS, write_rows  # noqa: E402
+
+
+# Paths of a small gradebook: two semesters, three courses, five syllabus items
+@pytest.fixture
+def paths(tmp_path):
+    paths = [str(tmp_path / name) for name in ("semesters.csv", "courses.csv", "grades.csv")]
+    write_rows(paths[0], SEMESTER_COLUMNS, [
+        ("Fall 2021", ""),
+        ("Winter 2022", ""),
+    ])
+    write_rows(paths[1], COURSE_COLUMNS, [
+        ("Fall 2021", "cct211", "0.5", ""),
+        ("Fall 2021", "cct222", "1.0", ""),
+        ("Winter 2022", "cct333", "0.5", ""),
+    ])
+    write_rows(paths[2], GRADE_COLUMNS, [
+        ("Fall 2021", "cct211", "a1", "40", "80"),
+        ("Fall 2021", "cct211", "exam", "60", ""),
+        ("Fall 2021", "cct222", "a1", "100", "70"),
+        ("Winter 2022", "cct333", "a1", "50", "90"),
+        ("Winter 2022", "cct333", "a2", "50", ""),
+    ])
+    return paths
+
@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+
+import pytest
+
+import gradebook_store
+from gradebook_store import COURSE_COLUMNS, GRADE_COLUMNS, GradebookStore, parse_rows, write_rows
+
+
+def open_journaled(paths):
+    return GradebookStore(*paths, journal=True, compact_bytes=math.inf)
+
+
+def grade(store, semester, course, syllabus):
+    return dict((name, grade) for name, _, grade in store.syllabus_rows(semester, course)).get(syllabus)
+
+
+# Journal replay after a crash
+
+def test_journal_is_replayed_and_compacted_after_a_crash(paths):
+    store = open_journaled(paths)
+    store.update_grade("Fall 2021", "cct211", "exam", "75")
+    store.add_syllabus_item("Winter 2022", "cct333", "a3", "10", "60")
+    store.delete_syllabus_item("Fall 2021", "cct222", "a1")
+    # The process dies here: no close(), so grades.csv was never rewritten
+    assert parse_rows(paths[2], 5)[1] == ("Fall 2021", "cct211", "exam", "60", "")
+
+    reopened = open_journaled(paths)
+    assert grade(reopened, "Fall 2021", "cct211", "exam") == "75"
+    assert grade(reopened, "Winter 2022", "cct333", "a3") == "60"
+    assert not reopened.has_syllabus_item("Fall 2021", "cct222", "a1")
+    assert not os.path.exists(paths[2] + ".journal")
+    assert ("Fall 2021", "cct211", "exam", "60", "75") in parse_rows(paths[2], 5)
+
+
+def test_torn_last_journal_line_is_skipped(paths):
+    store = open_journaled(paths)
+    store.update_grade("Fall 2021", "cct211", "exam", "75")
+    store.update_grade("Winter 2022", "cct333", "a2", "65")
+    with open(paths[2] + ".journal", mode="a") as file:
+        file.write('{"op": "grade", "semester": "Fall 20')  # Cut off mid-write
+
+    reopened = open_journaled(paths)
+    assert grade(reopened, "Fall 2021", "cct211", "exam") == "75"
+    assert grade(reopened, "Winter 2022", "cct333", "a2") == "65"
+
+
+def test_leftover_rotated_journal_is_replayed_before_the_new_one(paths, monkeypatch):
+    def crash(path, columns, rows):
+        raise OSError("disk full")
+
+    store = open_journaled(paths)
+    store.update_grade("Fall 2021", "cct211", "exam", "75")
+    monkeypatch.setattr(gradebook_store, "write_rows_atomic", crash)
+    with pytest.raises(OSError):
+        store.compact(background=False)  # Rotated the journal, then failed to write grades.csv
+    monkeypatch.undo()
+    assert os.path.exists(paths[2] + ".journal.old")
+    store.update_grade("Fall 2021", "cct211", "exam", "85")  # Goes to a fresh journal
+
+    reopened = open_journaled(paths)
+    assert grade(reopened, "Fall 2021", "cct211", "exam") == "85"
+    assert not os.path.exists(paths[2] + ".journal.old")
+    assert not os.path.exists(paths[2] + ".journal")
+
+
+# Background compaction racing new appends
+
+def test_appends_during_background_compaction_are_kept(paths, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    write = gradebook_store.write_rows_atomic
+
+    def slow_write(path, columns, rows):
+        started.set()
+        release.wait(5)
+        write(path, columns, rows)
+
+    store = open_journaled(paths)
+    store.update_grade("Fall 2021", "cct211", "exam", "75")
+    monkeypatch.setattr(gradebook_store, "write_rows_atomic", slow_write)
+    store.compact()
+    assert started.wait(5)
+    # The compaction has its rows; these changes must reach the new journal
+    store.update_grade("Fall 2021", "cct211", "a1", "95")
+    store.add_syllabus_item("Winter 2022", "cct333", "a3", "10", "60")
+    release.set()
+    store.compaction.join(5)
+    assert not store.compaction.is_alive()
+    assert not os.path.exists(paths[2] + ".journal.old")
+
+    reopened = open_journaled(paths)  # As if the app died now
+    assert grade(reopened, "Fall 2021", "cct211", "exam") == "75"
+    assert grade(reopened, "Fall 2021", "cct211", "a1") == "95"
+    assert grade(reopened, "Winter 2022", "cct333", "a3") == "60"
+
+
+def test_compactions_under_many_appends_lose_nothing(paths):
+    store = GradebookStore(*paths, journal=True, compact_bytes=512)
+    for mark in range(200):
+        store.update_grade("Winter 2022", "cct333", "a2", str(mark % 100))
+        store.add_syllabus_item("Fall 2021", "cct222", f"quiz{mark}", "1", str(mark % 100))
+    store.close()
+    assert not os.path.exists(paths[2] + ".journal")
+
+    reopened = GradebookStore(*paths)
+    assert grade(reopened, "Winter 2022", "cct333", "a2") == "99"
+    assert len(reopened.syllabus_rows("Fall 2021", "cct222")) == 201
+
+
+# Flush order
+
+def recording_store(paths, calls):
+    return GradebookStore(*paths, writer=lambda path, columns, rows: calls.append(os.path.basename(path)))
+
+
+def test_additions_are_written_parents_first(paths):
+    calls = []
+    store = recording_store(paths, calls)
+    with store.batch():
+        store.add_semester("Fall 2022")
+        store.add_course("Fall 2022", "cct444", "0.5")
+        store.add_syllabus_item("Fall 2022", "cct444", "a1", "100")
+    assert calls == ["semesters.csv", "courses.csv", "grades.csv"]
+
+
+def test_deletions_are_written_children_first(paths):
+    calls = []
+    store = recording_store(paths, calls)
+    store.delete_semester("Fall 2021")
+    assert calls == ["grades.csv", "courses.csv", "semesters.csv"]
+
+    calls.clear()
+    with store.batch():
+        store.add_semester("Fall 2022")
+        store.delete_course("Winter 2022", "cct333")
+    assert calls == ["grades.csv", "courses.csv", "semesters.csv"]
+
+
+# Duplicate rows
+
+def write_duplicates(paths):
+    write_rows(paths[1], COURSE_COLUMNS, parse_rows(paths[1], 4) + [("Winter 2022", "cct333", "1.0", "")])
+    write_rows(paths[2], GRADE_COLUMNS, parse_rows(paths[2], 5) + [("Fall 2021", "cct211", "a1", "40", "55")])
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_duplicate_rows_are_kept_when_other_rows_change(paths, journal):
+    write_duplicates(paths)
+    store = GradebookStore(*paths, journal=journal)
+    assert store.course_rows("Winter 2022") == [("cct333", "0.5", "")]  # The first row counts
+    assert grade(store, "Fall 2021", "cct211", "a1") == "80"
+    assert store.duplicates["courses"] == [("Winter 2022", "cct333", "1.0", "")]
+
+    store.update_grade("Fall 2021", "cct211", "exam", "70")
+    store.add_course("Winter 2022", "cct444", "0.5")
+    store.close()
+    assert ("Winter 2022", "cct333", "1.0", "") in parse_rows(paths[1], 4)
+    assert ("Fall 2021", "cct211", "a1", "40", "55") in parse_rows(paths[2], 5)
+    assert ("Fall 2021", "cct211", "exam", "60", "70") in parse_rows(paths[2], 5)
+
+
+def test_duplicate_rows_go_with_what_they_repeat(paths):
+    write_duplicates(paths)
+    store = GradebookStore(*paths)
+    store.delete_syllabus_item("Fall 2021", "cct211", "a1")
+    store.delete_course("Winter 2022", "cct333")
+    assert not any(row[:3] == ("Fall 2021", "cct211", "a1") for row in parse_rows(paths[2], 5))
+    assert not any(row[:2] == ("Winter 2022", "cct333") for row in parse_rows(paths[1], 4))
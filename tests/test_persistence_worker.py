@@ -0,0 +1,34 @@
+import threading
+
+from persistence_worker import PersistenceWorker
+
+
+def test_writes_run_in_order_of_their_latest_submit():
+    worker = PersistenceWorker()
+    release = threading.Event()
+    runs = []
+    worker.submit("blocker", lambda: release.wait(5) and runs.append("blocker"))
+
+    # An addition flush queues parents first; a deletion flush queued before
+    # the worker gets to them must still be written children first
+    for path in ["semesters.csv", "courses.csv", "grades.csv"]:
+        worker.submit(path, lambda path=path: runs.append((path, "added")))
+    for path in ["grades.csv", "courses.csv", "semesters.csv"]:
+        worker.submit(path, lambda path=path: runs.append((path, "deleted")))
+    release.set()
+
+    assert worker.stop() == []
+    assert runs == ["blocker", ("grades.csv", "deleted"), ("courses.csv", "deleted"), ("semesters.csv", "deleted")]
+
+
+def test_write_errors_are_reported_to_the_owner():
+    worker = PersistenceWorker()
+    done = []
+
+    def fail():
+        raise OSError("disk full")
+
+    worker.submit("grades.csv", fail, on_done=done.append)
+    errors = worker.stop()
+    assert [(path, str(error)) for path, error in errors] == [("grades.csv", "disk full")]
+    assert len(done) == 1 and isinstance(done[0], OSError)